@@ -10,33 +10,47 @@ INTEGER ARITHMETIC' of Khalid Daghameen and Nabil Arman
 # Python version: 2.7
 """
 
+import ctypes
+import heapq
 import numpy
 import math
+import multiprocessing
+import multiprocessing.pool
+import multiprocessing.sharedctypes
 
 class VisitedMatrix(object):
     """
-    Keeps track of the visited pixels in the image
+    Keeps track of the visited pixels in the image. For a PackedBinaryImage
+    the visited pixels are packed into bits as well.
     """
     _visited_matrix = None
+    _packed = False
+    _shape = None
 
     def __init__(self, image=None):
         """
         Creates a matrix that tracks the visited pixels of an
         underlying image.
         """
-        if None == image:
+        if image is None:
             raise ValueError("Image must be set" )
 
-        self._visited_matrix = numpy.zeros(image.shape)
+        self._shape = image.shape
+        self._packed = isinstance(image, PackedBinaryImage)
+
+        if self._packed:
+            self._visited_matrix = numpy.zeros(image.packedRows.shape, dtype=numpy.uint8)
+        else:
+            self._visited_matrix = numpy.zeros(image.shape, dtype=bool)
 
     def isValidIndice(self, x, y):
         """
         Checks if the pixel (x,y) is addressable
         """
-        if y < 0 or y > self._visited_matrix.shape[0]:
+        if y < 0 or y > self._shape[0]:
             return False
 
-        if x < 0 or x > self._visited_matrix.shape[1]:
+        if x < 0 or x > self._shape[1]:
             return False
 
         return True
@@ -48,6 +62,9 @@ class VisitedMatrix(object):
         if not self.isValidIndice(x, y):
             raise ValueError("Invalid indices x=" + str(x) + ", y=" + str(y))
 
+        if self._packed:
+            return 0 != (self._visited_matrix[y, x >> 3] & (0x80 >> (x & 7)))
+
         return 1 == self._visited_matrix[y,x]
 
     def setVisited(self, x, y):
@@ -57,7 +74,10 @@ class VisitedMatrix(object):
         if not self.isValidIndice(x, y):
             raise ValueError("Invalid indices x=" + str(x) + ", y=" + str(y))
   
-        self._visited_matrix[y,x] = 1
+        if self._packed:
+            self._visited_matrix[y, x >> 3] |= 0x80 >> (x & 7)
+        else:
+            self._visited_matrix[y,x] = 1
 
     def setRowVisited(self, y, x1, x2):
         """
@@ -71,8 +91,21 @@ class VisitedMatrix(object):
             x1 = x2
             x2 = temp
 
-        for i in range(x1, x2 + 1):
-            self.setVisited(i, y)
+        if not self._packed:
+            self._visited_matrix[y, x1:x2 + 1] = 1
+            return
+
+        row = self._visited_matrix[y]
+        (b1, b2) = (x1 >> 3, x2 >> 3)
+        first = 0xFF >> (x1 & 7)
+        last = (0xFF << (7 - (x2 & 7))) & 0xFF
+
+        if b1 == b2:
+            row[b1] |= first & last
+        else:
+            row[b1] |= first
+            row[b1 + 1:b2] = 0xFF
+            row[b2] |= last
 
     def setColumnVisited(self, x, y1, y2):
         """
@@ -86,8 +119,139 @@ class VisitedMatrix(object):
             y1 = y2
             y2 = temp
 
-        for i in range(y1, y2 + 1):
-            self.setVisited(x, i)
+        if self._packed:
+            self._visited_matrix[y1:y2 + 1, x >> 3] |= 0x80 >> (x & 7)
+        else:
+            self._visited_matrix[y1:y2 + 1, x] = 1
+
+class PackedBinaryImage(object):
+    """
+    Binary image whose rows are packed into bits as done by numpy.packbits(..., axis=1),
+    so a pixel needs one bit of memory. Pixels can be read via image[y, x] like pixels
+    of a numpy array; runs of line pixels are found on the packed bytes.
+    """
+    packedRows = None
+    shape = None
+
+    def __init__(self, packedRows, width):
+        """
+        Constructor
+        packedRows:
+            numpy uint8 array of the shape (height, ceil(width / 8)), the most significant
+            bit of a byte holds the leftmost pixel
+        width:
+            number of pixels per row
+        """
+        packedRows = numpy.ascontiguousarray(packedRows, dtype=numpy.uint8)
+
+        if not 2 == packedRows.ndim or not packedRows.shape[1] == (width + 7) // 8:
+            raise ValueError("packedRows must have the shape (height, ceil(width / 8))")
+
+        self.packedRows = packedRows
+        self.shape = (packedRows.shape[0], int(width))
+
+    def __getitem__(self, key):
+        """
+        Overload image[y, x], returns True if the pixel is set
+        """
+        (y, x) = key
+        return 0 != (self.packedRows[y, x >> 3] & (0x80 >> (x & 7)))
+
+    def getRow(self, y):
+        """
+        Returns row y as boolean numpy array
+        """
+        return numpy.unpackbits(self.packedRows[y])[:self.shape[1]].astype(bool)
+
+    def findRunEnd(self, y, x):
+        """
+        Returns the x coordinate of the last pixel of the run of set pixels
+        in row y that starts at x
+        """
+        row = self.packedRows[y]
+        x = int(x)
+        b = x >> 3
+        # unset pixels at or right of x in the first byte
+        unset = ~int(row[b]) & (0xFF >> (x & 7))
+
+        if 0 == unset:
+            full = numpy.flatnonzero(row[b+1:] != 0xFF)
+            if 0 == len(full):
+                return self.shape[1] - 1
+
+            b += 1 + int(full[0])
+            unset = ~int(row[b]) & 0xFF
+
+        # the leftmost unset pixel ends the run, the padding bits are never set
+        return min((b << 3) + 8 - unset.bit_length() - 1, self.shape[1] - 1)
+
+    def findRunStart(self, y, x):
+        """
+        Returns the x coordinate of the first pixel of the run of set pixels
+        in row y that ends at x
+        """
+        row = self.packedRows[y]
+        x = int(x)
+        b = x >> 3
+        # unset pixels at or left of x in the first byte
+        unset = ~int(row[b]) & (0xFF << (7 - (x & 7))) & 0xFF
+
+        if 0 == unset:
+            full = numpy.flatnonzero(row[:b] != 0xFF)
+            if 0 == len(full):
+                return 0
+
+            b = int(full[-1])
+            unset = ~int(row[b]) & 0xFF
+
+        # the rightmost unset pixel starts the run
+        return (b << 3) + 8 - (unset & -unset).bit_length() + 1
+
+    def findColumnRunEnd(self, x, y):
+        """
+        Returns the y coordinate of the last pixel of the run of set pixels
+        in column x that starts at y
+        """
+        column = self.packedRows[y:, x >> 3] & (0x80 >> (x & 7))
+        unset = numpy.flatnonzero(0 == column)
+        if 0 == len(unset):
+            return self.shape[0] - 1
+
+        return y + int(unset[0]) - 1
+
+def packBinaryImage(image):
+    """
+    Packs a binary image (every pixel that is not 0 is set) into a PackedBinaryImage
+    """
+    image = numpy.asarray(image)
+    return PackedBinaryImage(numpy.packbits(0 != image, axis=1), image.shape[1])
+
+def isNonZeroColor(_color):
+    """
+    Default 'isLineColor' for binary images: every pixel that is not 0 is part of a line
+    """
+    return 0 != _color
+
+def isBinaryImage(image):
+    """
+    Returns 'True' if the image is a PackedBinaryImage or a numpy array of type bool or
+    uint8 that can be handled without an 'isLineColor' function
+    """
+    if isinstance(image, PackedBinaryImage):
+        return True
+
+    return isinstance(image, numpy.ndarray) and image.dtype in (numpy.bool_, numpy.uint8)
+
+def _findRunEnd(array, start):
+    """
+    Returns the index of the last non zero element of the run that starts at 'start'
+    in the one dimensional numpy array 'array'
+    """
+    unset = numpy.flatnonzero(0 == array[start:])
+    if 0 == len(unset):
+        return len(array) - 1
+
+    return start + int(unset[0]) - 1
 
 class LineSegment(object):
     """
@@ -249,14 +413,35 @@ class LineSegment(object):
 
         return isLineColor(image[temp_y, temp_x])
 
-def findVerticalSegment(image, x, y, isLineColor):
+def _findNextLinePixel(isSet, x, y, dx, dy, maxGap):
     """
-    Travels to the end of the current line segment in positive y direction and returns
-    the coordinates.
+    Bridges a gap that starts at pixel (x,y) and runs in direction (dx,dy). Returns
+    the coordinates of the first line pixel behind the gap if the gap is at most
+    'maxGap' pixels long, otherwise None.
+    isSet(x, y):
+        returns True if (x,y) is a line pixel inside the image
     """
+    for k in range(1, maxGap + 1):
+        if isSet(x + k * dx, y + k * dy):
+            return (x + k * dx, y + k * dy)
 
-    if None == image:
-        raise ValueError("Image must be set" )
+    return None
+
+def _isLinePixel(image, x, y, isLineColor):
+    """
+    Returns 'True' if (x,y) lies inside the image and is part of a line
+    """
+    if y < 0 or y >= image.shape[0] or x < 0 or x >= image.shape[1]:
+        return False
+
+    return isLineColor(image[y, x])
+
+def _findVerticalRun(image, x, y, isLineColor):
+    if isLineColor is isNonZeroColor and isLineColor(image[y,x]):
+        if isinstance(image, PackedBinaryImage):
+            return (x, image.findColumnRunEnd(x, y))
+
+        return (x, _findRunEnd(image[:,x], y))
 
     l = y
     while l < image.shape[0] and isLineColor(image[l,x]):
@@ -264,89 +449,426 @@ def findVerticalSegment(image, x, y, isLineColor):
 
     return (x, l-1)
 
-def findHorizontalNegativeSegment(image, x, y, isLineColor):
+def _findHorizontalNegativeRun(image, x, y, isLineColor):
+    if isLineColor is isNonZeroColor and isLineColor(image[y,x]):
+        if isinstance(image, PackedBinaryImage):
+            return (image.findRunStart(y, x), y)
+
+        return (x - _findRunEnd(image[y,x::-1], 0), y)
+
+    l = x
+    while l >= 0 and isLineColor(image[y,l]):
+        l -= 1
+
+    return (l+1, y)
+
+def _findHorizontalPositiveRun(image, x, y, isLineColor):
+    if isLineColor is isNonZeroColor and isLineColor(image[y,x]):
+        if isinstance(image, PackedBinaryImage):
+            return (image.findRunEnd(y, x), y)
+
+        return (_findRunEnd(image[y], x), y)
+
+    l = x
+    while l < image.shape[1] and isLineColor(image[y,l]):
+        l += 1
+
+    return (l-1, y)
+
+def findVerticalSegment(image, x, y, isLineColor, maxGap=0):
+    """
+    Travels to the end of the current line segment in positive y direction and returns
+    the coordinates.
+    maxGap:
+        Gaps of up to maxGap pixels within the segment are bridged
+    """
+
+    if image is None:
+        raise ValueError("Image must be set" )
+
+    (x_end, y_end) = _findVerticalRun(image, x, y, isLineColor)
+
+    while maxGap > 0 and y_end >= y:
+        resume = _findNextLinePixel(lambda i, j: _isLinePixel(image, i, j, isLineColor), x, y_end + 1, 0, 1, maxGap)
+        if None == resume:
+            break
+
+        (x_end, y_end) = _findVerticalRun(image, x, resume[1], isLineColor)
+
+    return (x_end, y_end)
+
+def findHorizontalNegativeSegment(image, x, y, isLineColor, maxGap=0):
     """
     Travels to the end of the current line segment in negative x direction and returns
     the coordinates.
+    maxGap:
+        Gaps of up to maxGap pixels within the segment are bridged
     """
-    if None == image:
+    if image is None:
         raise ValueError("Image must be set" )
 
-    l = x
-    while l >= 0 and isLineColor(image[y,l]):
-        l -= 1
+    (x_end, y_end) = _findHorizontalNegativeRun(image, x, y, isLineColor)
+
+    while maxGap > 0 and x_end <= x:
+        resume = _findNextLinePixel(lambda i, j: _isLinePixel(image, i, j, isLineColor), x_end - 1, y, -1, 0, maxGap)
+        if None == resume:
+            break
+
+        (x_end, y_end) = _findHorizontalNegativeRun(image, resume[0], y, isLineColor)
 
-    return (l+1, y) 
+    return (x_end, y_end)
 
-def findHorizontalPositiveSegment(image, x, y, isLineColor):
+def findHorizontalPositiveSegment(image, x, y, isLineColor, maxGap=0):
     """
     Travels to the end of the current line segment in positive x direction and returns
     the coordinates.
+    maxGap:
+        Gaps of up to maxGap pixels within the segment are bridged
     """
 
-    if None == image:
+    if image is None:
         raise ValueError("Image must be set" )
 
-    l = x
-    while l < image.shape[1] and isLineColor(image[y,l]):
-        l += 1
+    (x_end, y_end) = _findHorizontalPositiveRun(image, x, y, isLineColor)
+
+    while maxGap > 0 and x_end >= x:
+        resume = _findNextLinePixel(lambda i, j: _isLinePixel(image, i, j, isLineColor), x_end + 1, y, 1, 0, maxGap)
+        if None == resume:
+            break
+
+        (x_end, y_end) = _findHorizontalPositiveRun(image, resume[0], y, isLineColor)
 
-    return (l-1, y) 
+    return (x_end, y_end)
 
-def handleFourthOctant(image, lineSegment, visited_matrix, isLineColor):
+class _PixelRuns(object):
     """
-    Tracks line segments in negative x direction
+    Answers the questions of the octant trackers (is a pixel part of a line, where
+    does a run of line pixels end) by reading the image pixel by pixel or, for
+    binary images, with numpy on single rows and columns.
+    """
+    shape = None
+    maxGap = 0
+
+    def __init__(self, image, isLineColor, maxGap=0):
+        self.shape = image.shape
+        self.maxGap = maxGap
+        self._image = image
+        self._isLineColor = isLineColor
+
+    def isSet(self, x, y):
+        return _isLinePixel(self._image, x, y, self._isLineColor)
+
+    def findRowEnd(self, x, y):
+        return findHorizontalPositiveSegment(self._image, x, y, self._isLineColor, maxGap=self.maxGap)[0]
+
+    def findRowStart(self, x, y):
+        return findHorizontalNegativeSegment(self._image, x, y, self._isLineColor, maxGap=self.maxGap)[0]
+
+    def findColumnEnd(self, x, y):
+        return findVerticalSegment(self._image, x, y, self._isLineColor, maxGap=self.maxGap)[1]
+
+def _bridgeGaps(mask, maxGap, axis):
+    """
+    Returns the mask with all gaps of up to 'maxGap' unset pixels between two set
+    pixels along 'axis' filled
+    """
+    if 0 == maxGap:
+        return mask
+
+    n = mask.shape[axis]
+    shape = [1, 1]
+    shape[axis] = n
+    indices = numpy.arange(n).reshape(shape)
+
+    previousSet = numpy.maximum.accumulate(numpy.where(mask, indices, -1), axis=axis)
+    nextSet = numpy.flip(numpy.minimum.accumulate(numpy.flip(numpy.where(mask, indices, n), axis), axis=axis), axis)
+
+    return mask | ((previousSet >= 0) & (nextSet < n) & (nextSet - previousSet - 1 <= maxGap))
+
+def _findRunBounds(mask, axis):
+    """
+    Returns for every pixel the index of the first and the last pixel of the run
+    of set pixels along 'axis' that contains it (only meaningful for set pixels)
+    """
+    n = mask.shape[axis]
+    shape = [1, 1]
+    shape[axis] = n
+    indices = numpy.arange(n, dtype=numpy.int32).reshape(shape)
+
+    runStart = numpy.maximum.accumulate(numpy.where(mask, -1, indices), axis=axis) + 1
+    runEnd = numpy.flip(numpy.minimum.accumulate(numpy.flip(numpy.where(mask, n, indices), axis), axis=axis), axis) - 1
+
+    return (runStart, runEnd)
+
+def _findRowRuns(mask, maxGap=0):
+    """
+    Returns the tables (rowStart, rowEnd) of the runs in the rows of the mask, gaps of
+    up to maxGap pixels are bridged
+    """
+    return _findRunBounds(_bridgeGaps(mask, maxGap, 1), 1)
+
+def _findColumnRunEnds(mask, maxGap=0):
+    """
+    Returns the table columnEnd of the runs in the columns of the mask, gaps of up to
+    maxGap pixels are bridged
+    """
+    return _findRunBounds(_bridgeGaps(mask, maxGap, 0), 0)[1]
+
+class _RunTables(_PixelRuns):
+    """
+    Answers the questions of the octant trackers by looking them up in tables that
+    are computed with numpy for a whole boolean mask: for every pixel the start and
+    the end of its run in the row and the end of its run in the column.
+    """
+    mask = None
+    rowStart = None
+    rowEnd = None
+    columnEnd = None
+
+    def __init__(self, mask, maxGap=0, rowStart=None, rowEnd=None, columnEnd=None):
+        self.mask = mask
+        self.shape = mask.shape
+        self.maxGap = maxGap
+
+        if None is rowStart or None is rowEnd:
+            (rowStart, rowEnd) = _findRowRuns(mask, maxGap)
+
+        if None is columnEnd:
+            columnEnd = _findColumnRunEnds(mask, maxGap)
+
+        self.rowStart = rowStart
+        self.rowEnd = rowEnd
+        self.columnEnd = columnEnd
+
+    def updateRows(self, rows):
+        """
+        Recomputes the row tables of the given rows after the mask was changed
+        """
+        (self.rowStart[rows], self.rowEnd[rows]) = _findRowRuns(self.mask[rows], self.maxGap)
+
+    def updateColumns(self, columns):
+        """
+        Recomputes the column table of the given columns after the mask was changed
+        """
+        self.columnEnd[:, columns] = _findColumnRunEnds(self.mask[:, columns], self.maxGap)
+
+    def isSet(self, x, y):
+        return 0 <= y < self.shape[0] and 0 <= x < self.shape[1] and bool(self.mask[y, x])
+
+    def findRowEnd(self, x, y):
+        return int(self.rowEnd[y, x])
+
+    def findRowStart(self, x, y):
+        return int(self.rowStart[y, x])
+
+    def findColumnEnd(self, x, y):
+        return int(self.columnEnd[y, x])
+
+def _trackFourthOctant(runs, lineSegment, visited_matrix, lengthSlack=0):
+    """
+    Tracks line segments in negative x direction (see handleFourthOctant(...))
     """
     length = lineSegment.getXLength()
-    max_length = 2*length
-    moreSeg = True
-    while moreSeg:
+    min_length = max(1, length - lengthSlack)
+    max_length = 2*length + lengthSlack
+    while True:
         x_temp = lineSegment.x_start - 1
         y_temp = lineSegment.y_start + 1
 
-        if lineSegment.isNextPixelLeftDown(image, isLineColor):
-            (x_end, y_end) = findHorizontalNegativeSegment(image, x_temp, y_temp, isLineColor)
+        if not runs.isSet(x_temp, y_temp):
+            resume = _findNextLinePixel(runs.isSet, x_temp, y_temp, -1, 0, runs.maxGap)
+            if None == resume:
+                break
 
-        else:
-            moreSeg = False
+            x_temp = resume[0]
+
+        x_end = runs.findRowStart(x_temp, y_temp)
 
         lengthX = x_temp - x_end + 1
-        if lengthX >= length and lengthX <= max_length:
-            lineSegment.setStartCoordinate(x_end, y_end)
-            visited_matrix.setRowVisited(y_temp, x_temp, x_end)
-        else:
-            moreSeg = False
-        
+        if lengthX < min_length or lengthX > max_length:
+            break
+
+        lineSegment.setStartCoordinate(x_end, y_temp)
+        visited_matrix.setRowVisited(y_temp, x_temp, x_end)
+
     return lineSegment
 
-def handleSeventhOctant(image, lineSegment, visited_matrix, isLineColor):
+def _trackSeventhOctant(runs, lineSegment, visited_matrix, lengthSlack=0):
     """
-    Tracks line segments in positive x direction
+    Tracks line segments in positive x direction (see handleSeventhOctant(...))
     """
     length = lineSegment.getXLength()
-    max_length = 2*length
-    moreSeg = True
-    while moreSeg:
+    min_length = max(1, length - lengthSlack)
+    max_length = 2*length + lengthSlack
+    while True:
         x_temp = lineSegment.x_end + 1
         y_temp = lineSegment.y_end + 1
 
-        if lineSegment.isNextPixelRightDown(image, isLineColor):
-            (x_end, y_end) = findHorizontalPositiveSegment(image, x_temp, y_temp, isLineColor)
-        else:
-            moreSeg = False
+        if not runs.isSet(x_temp, y_temp):
+            resume = _findNextLinePixel(runs.isSet, x_temp, y_temp, 1, 0, runs.maxGap)
+            if None == resume:
+                break
+
+            x_temp = resume[0]
+
+        x_end = runs.findRowEnd(x_temp, y_temp)
 
         lengthX = x_end - x_temp + 1
+        if lengthX < min_length or lengthX > max_length:
+            break
+
+        lineSegment.setEndCoordinate(x_end, y_temp)
+        visited_matrix.setRowVisited(y_temp, x_temp, x_end)
+
+    return lineSegment
+
+def _trackFourthAndSeventhOctant(runs, lineSegment, visited_matrix, lengthSlack=0):
+    """
+    Tracks x-oriented lines (see handleFourthAndSeventhOctant(...))
+    """
+    x_end = runs.findRowEnd(lineSegment.x_start, lineSegment.y_start)
+    y_end = lineSegment.y_start
+    lineSegment.setEndCoordinate(x_end, y_end)
+    visited_matrix.setRowVisited(y_end, lineSegment.x_start, x_end)
+
+    if runs.isSet(x_end + 1, y_end + 1):
+        lineSegment = _trackSeventhOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
+    elif runs.isSet(lineSegment.x_start - 1, y_end + 1):
+        lineSegment = _trackFourthOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
+    elif not None == _findNextLinePixel(runs.isSet, x_end + 1, y_end + 1, 1, 0, runs.maxGap):
+        lineSegment = _trackSeventhOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
+    elif not None == _findNextLinePixel(runs.isSet, lineSegment.x_start - 1, y_end + 1, -1, 0, runs.maxGap):
+        lineSegment = _trackFourthOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
+
+    return lineSegment
+
+def _trackFifthAndSixthOctant(runs, lineSegment, visited_matrix, lengthSlack=0):
+    """
+    Tracks y-oriented lines (see handleFifthAndSixthOctant(...))
+    """
+    y_end = runs.findColumnEnd(lineSegment.x_start, lineSegment.y_start)
+    lineSegment.setEndCoordinate(lineSegment.x_start, y_end)
+    visited_matrix.setColumnVisited(lineSegment.x_start, lineSegment.y_start, y_end)
 
-        if lengthX >= length and lengthX <= max_length:
-            lineSegment.setEndCoordinate(x_end, y_end)
-            visited_matrix.setRowVisited(y_temp, x_temp, x_end)
+    x_temp = lineSegment.x_start
+
+    length = lineSegment.getYLength()
+    min_length = max(1, length - lengthSlack)
+    max_length = 2 * length + lengthSlack
+
+    while True:
+
+        y_temp = lineSegment.y_end + 1
+
+        if runs.isSet(x_temp - 1, y_temp):
+            x_temp -= 1
+        elif runs.isSet(x_temp + 1, y_temp):
+            x_temp += 1
         else:
-            moreSeg = False
+            resume = _findNextVerticalRun(runs, x_temp, y_temp)
+            if None == resume:
+                break
+
+            (x_temp, y_temp) = resume
+
+        y_end = runs.findColumnEnd(x_temp, y_temp)
+
+        lengthY = (y_end - y_temp) + 1
+        if lengthY < min_length or lengthY > max_length:
+            break
+
+        lineSegment.setEndCoordinate(x_temp, y_end)
+        visited_matrix.setColumnVisited(x_temp, y_temp, y_end)
 
-        
     return lineSegment
 
-def handleFourthAndSeventhOctant(image, lineSegment, visited_matrix, isLineColor):
+def _findNextVerticalRun(runs, x, y):
+    """
+    Looks for the start of the next y-oriented line segment left down or right down
+    of the pixel (x, y-1) behind a gap of up to maxGap rows
+    """
+    for k in range(1, runs.maxGap + 1):
+        if y + k >= runs.shape[0]:
+            return None
+
+        for x_temp in (x - 1, x + 1):
+            if runs.isSet(x_temp, y + k):
+                return (x_temp, y + k)
+
+    return None
+
+def _isVerticalStart(runs, x, y):
+    """
+    Tests if the line that starts at the pixel (x,y) is y-oriented
+    """
+    if runs.isSet(x, y + 1):
+        return True
+
+    # a pixel to the right starts a x-oriented line segment
+    if 0 == runs.maxGap or runs.isSet(x + 1, y):
+        return False
+
+    return not None == _findNextLinePixel(runs.isSet, x, y + 1, 0, 1, runs.maxGap)
+
+def _trackLine(runs, visited_matrix, x, y, lengthSlack=0):
+    """
+    Tracks the line that starts at the line pixel (x,y) and returns it
+    """
+    lineSegment = LineSegment(x, y, x, y)
+
+    if _isVerticalStart(runs, x, y):
+        lineSegment.setVertical()
+        return _trackFifthAndSixthOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
+
+    return _trackFourthAndSeventhOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
+
+def _scanLines(runs, visited_matrix, rows, lengthSlack=0):
+    """
+    Tracks a line from every line pixel that is not visited yet and yields the lines
+    rows:
+        iterable of (y, x coordinates of the line pixels in row y) from top to bottom
+    """
+    for (i, columns) in rows:
+        for j in columns:
+            if not visited_matrix.isVisited(j, i):
+                yield _trackLine(runs, visited_matrix, j, i, lengthSlack=lengthSlack)
+
+def _iterMaskRows(mask, y1=0, y2=None):
+    """
+    Yields (y, x coordinates of the set pixels in row y) for the rows y1 ... y2-1
+    (by default all rows) of the mask
+    """
+    if None == y2:
+        y2 = mask.shape[0]
+
+    for i in range(y1, y2):
+        yield (i, numpy.flatnonzero(mask[i]).tolist())
+
+def handleFourthOctant(image, lineSegment, visited_matrix, isLineColor, maxGap=0, lengthSlack=0):
+    """
+    Tracks line segments in negative x direction
+    maxGap:
+        Gaps of up to maxGap pixels within and between the line segments are bridged
+    lengthSlack:
+        Number of pixels a line segment may be shorter or longer than the window
+        [length, 2*length] of the first segment
+    """
+    runs = _PixelRuns(image, isLineColor, maxGap=maxGap)
+    return _trackFourthOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
+
+def handleSeventhOctant(image, lineSegment, visited_matrix, isLineColor, maxGap=0, lengthSlack=0):
+    """
+    Tracks line segments in positive x direction
+    maxGap:
+        Gaps of up to maxGap pixels within and between the line segments are bridged
+    lengthSlack:
+        Number of pixels a line segment may be shorter or longer than the window
+        [length, 2*length] of the first segment
+    """
+    runs = _PixelRuns(image, isLineColor, maxGap=maxGap)
+    return _trackSeventhOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
+
+def handleFourthAndSeventhOctant(image, lineSegment, visited_matrix, isLineColor, maxGap=0, lengthSlack=0):
     """
     Handle lines in the fourth and seventh octant.
     ------------------------
@@ -366,19 +888,16 @@ def handleFourthAndSeventhOctant(image, lineSegment, visited_matrix, isLineColor
             xx
               xx
 
+    maxGap:
+        Gaps of up to maxGap pixels within and between the line segments are bridged
+    lengthSlack:
+        Number of pixels a line segment may be shorter or longer than the window
+        [length, 2*length] of the first segment
     """
-    (x_end, y_end) = findHorizontalPositiveSegment(image, lineSegment.x_start, lineSegment.y_start, isLineColor)
-    lineSegment.setEndCoordinate(x_end, y_end)
-    visited_matrix.setRowVisited(y_end, lineSegment.x_start, x_end)
-
-    if lineSegment.isNextPixelRightDown(image, isLineColor):
-        lineSegment = handleSeventhOctant(image, lineSegment, visited_matrix, isLineColor)
-    elif lineSegment.isNextPixelLeftDown(image, isLineColor):
-        lineSegment = handleFourthOctant(image, lineSegment, visited_matrix, isLineColor)
-        
-    return lineSegment
+    runs = _PixelRuns(image, isLineColor, maxGap=maxGap)
+    return _trackFourthAndSeventhOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
 
-def handleFifthAndSixthOctant(image, lineSegment, visited_matrix, isLineColor):
+def handleFifthAndSixthOctant(image, lineSegment, visited_matrix, isLineColor, maxGap=0, lengthSlack=0):
     """
     Handle lines in the fith and sixth octant.
     ------------------------
@@ -402,44 +921,146 @@ def handleFifthAndSixthOctant(image, lineSegment, visited_matrix, isLineColor):
            x
            x
 
+    maxGap:
+        Gaps of up to maxGap pixels within and between the line segments are bridged
+    lengthSlack:
+        Number of pixels a line segment may be shorter or longer than the window
+        [length, 2*length] of the first segment
     """
-    (x_end, y_end) = findVerticalSegment(image, lineSegment.x_start, lineSegment.y_start, isLineColor)
-    lineSegment.setEndCoordinate(x_end, y_end)
-    visited_matrix.setColumnVisited(lineSegment.x_start, lineSegment.y_start, y_end)
+    runs = _PixelRuns(image, isLineColor, maxGap=maxGap)
+    return _trackFifthAndSixthOctant(runs, lineSegment, visited_matrix, lengthSlack=lengthSlack)
 
-    moreSeg = True
-    x_temp = lineSegment.x_start
+def iterLines(image, isLineColor=None, batchSize=None, maxGap=0, lengthSlack=0):
+    """
+    Detects lines in the given image and yields every line as soon as it is
+    tracked. Stopping the iteration stops the scan.
+    image:
+        Image that contains the lines as numpy array or PackedBinaryImage
+    isLineColor(_color):
+        A function that determines whether a given pixel color value '_color' is part of 
+        a line (see _findLines(...))
+    batchSize:
+        If set, the lines are yielded in batches of up to 'batchSize' lines as numpy
+        array [[x1,y1,x2,y2],...] instead of one LineSegment at a time
+    maxGap:
+        Gaps of up to maxGap missing pixels are bridged while a line is tracked
+    lengthSlack:
+        Number of pixels a line segment may be shorter or longer than the window
+        [length, 2*length] that the tracking accepts
 
-    length = lineSegment.getYLength()
-    max_length = 2 * length
+    return:
+        generator of LineSegments (or numpy arrays)
+    """
+    # the arguments are checked here, so that invalid ones raise when iterLines is
+    # called and not when the first line is requested
+    if image is None:
+        raise ValueError("Image must be set" )
 
-    while moreSeg:
+    if None == isLineColor:
+        if not isBinaryImage(image):
+            raise ValueError("isLineColor(_color) not set")
 
-        y_temp = lineSegment.y_end + 1
+        isLineColor = isNonZeroColor
 
-        if lineSegment.isNextPixelLeftDown(image, isLineColor):
-            x_temp -= 1
-            (x_end, y_end) = findVerticalSegment(image, x_temp, y_temp, isLineColor)
-        elif lineSegment.isNextPixelRightDown(image, isLineColor):
-            x_temp += 1
-            (x_end, y_end) = findVerticalSegment(image, x_temp, y_temp, isLineColor)
-        else:
-            moreSeg = False
+    if maxGap < 0 or lengthSlack < 0:
+        raise ValueError("maxGap and lengthSlack must not be negative")
 
-        lengthY = (y_end - y_temp) + 1
-        if lengthY >= length and lengthY <= max_length:
-            lineSegment.setEndCoordinate(x_end, y_end)
-            visited_matrix.setColumnVisited(x_temp, y_temp, y_end)
+    if not None == batchSize:
+        if batchSize < 1:
+            raise ValueError("batchSize must be at least 1")
+
+        return _iterBatches(_iterLines(image, isLineColor, maxGap, lengthSlack), batchSize)
+
+    return _iterLines(image, isLineColor, maxGap, lengthSlack)
+
+def _iterLines(image, isLineColor, maxGap, lengthSlack):
+    """
+    Yields the lines of the image (see iterLines(...))
+    """
+    runs = _PixelRuns(image, isLineColor, maxGap=maxGap)
+    rows = ((i, _iterCandidatePixels(image, i, isLineColor)) for i in range(image.shape[0]))
+
+    for lineSegment in _scanLines(runs, VisitedMatrix(image), rows, lengthSlack=lengthSlack):
+        yield lineSegment
+
+def _iterCandidatePixels(image, y, isLineColor):
+    """
+    Yields the x coordinates of the line pixels in row y
+    """
+    if isLineColor is isNonZeroColor:
+        if isinstance(image, PackedBinaryImage):
+            row = image.getRow(y)
         else:
-            moreSeg = False
+            row = image[y]
 
-    return lineSegment
+        for x in numpy.flatnonzero(row):
+            yield int(x)
+    else:
+        for x in range(image.shape[1]):
+            if isLineColor(image[y,x]):
+                yield x
+
+def _iterBatches(lines, batchSize):
+    """
+    Collects the given LineSegments in numpy arrays [[x1,y1,x2,y2],...] of up to
+    'batchSize' lines
+    """
+    batch = []
+    for line in lines:
+        batch.append(line.getAsNumpyArray())
+        if len(batch) == batchSize:
+            yield numpy.array(batch)
+            batch = []
 
-def _findLines(image, isLineColor=None):
+    if len(batch) > 0:
+        yield numpy.array(batch)
+
+def filterLines(lines, minLength=None, skipPoints=False):
+    """
+    Filters a stream of LineSegments or of batches of lines as numpy arrays
+    [[x1,y1,x2,y2],...] (e.g., the generator returned by iterLines(...)) and yields
+    the lines that pass. Batches are filtered as a whole and yielded without the
+    dropped lines, empty batches are skipped.
+    minLength:
+        Lines shorter than minLength (see LineSegment.getLineLength()) are dropped
+    skipPoints:
+        If True, lines that consist of a single pixel are dropped
+    """
+    for line in lines:
+        if isinstance(line, numpy.ndarray) and 2 == line.ndim:
+            batch = line[_isLineKept(line, minLength, skipPoints)]
+            if len(batch) > 0:
+                yield batch
+
+            continue
+
+        if skipPoints and line.isPoint():
+            continue
+
+        if not None == minLength and line.getLineLength() < minLength:
+            continue
+
+        yield line
+
+def _isLineKept(batch, minLength, skipPoints):
+    """
+    Returns for every line of the batch [[x1,y1,x2,y2],...] if it passes filterLines(...)
+    """
+    kept = numpy.ones(len(batch), dtype=bool)
+
+    if skipPoints:
+        kept &= (batch[:, 0] != batch[:, 2]) | (batch[:, 1] != batch[:, 3])
+
+    if not None == minLength:
+        kept &= _getLineLengths(batch) >= minLength
+
+    return kept
+
+def _findLines(image, isLineColor=None, maxGap=0, lengthSlack=0):
     """
     Detects lines in the given image and returns them as a list
     image:
-        Image that contains the lines as numpy array
+        Image that contains the lines as numpy array or PackedBinaryImage
     isLineColor(_color):
         A function that determines whether a given pixel color value '_color' is part of 
         a line, e.g.:
@@ -448,33 +1069,19 @@ def _findLines(image, isLineColor=None):
             isLineColor(_color):
                 return _color > mean
 
+        For binary images (bool, uint8 or PackedBinaryImage) it can be omitted, then every
+        pixel that is not 0 is part of a line.
+    maxGap:
+        Gaps of up to maxGap missing pixels are bridged while a line is tracked, so that
+        broken (e.g., anti-aliased or noisy) lines result in fewer line segments
+    lengthSlack:
+        Number of pixels a line segment may be shorter or longer than the window
+        [length, 2*length] that the tracking accepts
+
     return:
         list of lines as LineSegment
     """
-
-    if None == image:
-        raise ValueError("Image must be set" )
-
-    if None == isLineColor:
-        raise ValueError("isLineColor(_color) not set")
-
-    lines = []
-    visited_matrix = VisitedMatrix(image)
-    
-    for i in range(image.shape[0]):
-        for j in range(image.shape[1]):
-            if isLineColor(image[i,j]) and not visited_matrix.isVisited(j, i):
-                lineSegment = LineSegment(j, i, j, i)
-
-                if lineSegment.isNextPixelBelow(image, isLineColor):
-                    lineSegment.setVertical()
-                    lineSegment = handleFifthAndSixthOctant(image, lineSegment, visited_matrix, isLineColor=isLineColor)
-                else:
-                    lineSegment = handleFourthAndSeventhOctant(image, lineSegment, visited_matrix, isLineColor=isLineColor)
-
-                lines.append(lineSegment)
-
-    return lines 
+    return list(iterLines(image, isLineColor=isLineColor, maxGap=maxGap, lengthSlack=lengthSlack))
 
 def transformLineSegmentsIntoNumpyArray(lines):
     """
@@ -489,11 +1096,11 @@ def transformLineSegmentsIntoNumpyArray(lines):
     return lineparts
 
 
-def findLines(image, isLineColor=None):
+def findLines(image, isLineColor=None, maxGap=0, lengthSlack=0):
     """
     Detects lines in the given image and returns them as a list
     image:
-        Image that contains the lines as numpy array
+        Image that contains the lines as numpy array or PackedBinaryImage
     isLineColor(_color):
         A function that determines whether a given pixel color value 'x' is part of 
         a line, e.g.:
@@ -502,9 +1109,380 @@ def findLines(image, isLineColor=None):
             isLineColor(_color):
                 return _color > mean
 
+        For binary images (bool, uint8 or PackedBinaryImage) it can be omitted, then every
+        pixel that is not 0 is part of a line.
+    maxGap:
+        Gaps of up to maxGap missing pixels are bridged while a line is tracked, so that
+        broken (e.g., anti-aliased or noisy) lines result in fewer line segments
+    lengthSlack:
+        Number of pixels a line segment may be shorter or longer than the window
+        [length, 2*length] that the tracking accepts
+
+    return:
+        list of lines as numpy array [x1,y1,x2,y2]
+    """
+    lines = _findLines(image, isLineColor=isLineColor, maxGap=maxGap, lengthSlack=lengthSlack)
+
+    return transformLineSegmentsIntoNumpyArray(lines)
+
+def _getLineLengths(lines):
+    """
+    Returns the lengths of the lines given as numpy arrays [x1,y1,x2,y2] as computed
+    by LineSegment.getLineLength()
+    """
+    if 0 == len(lines):
+        return numpy.zeros(0)
+
+    lines = numpy.array(lines).reshape(-1, 4)
+    a = (numpy.abs(lines[:, 2] - lines[:, 0]) + 1) ** 2
+    b = (numpy.abs(lines[:, 3] - lines[:, 1]) + 1) ** 2
+
+    return numpy.sqrt(a + b)
+
+def sweepThresholds(image, thresholds, bins=10, maxGap=0, lengthSlack=0):
+    """
+    Detects lines for several thresholds, where a pixel is part of a line if its value
+    is greater than the threshold (like isLineColor(_color) with _color > threshold).
+    The pixel values are sorted once. The thresholds are processed from the highest to
+    the lowest, so that the mask of line pixels only grows and is updated by the pixels
+    that pass the next threshold. The run tables of the tracker are kept between the
+    thresholds and only the rows and columns that got new pixels are recomputed.
+    Thresholds that do not change the mask reuse the lines of the previous threshold.
+    image:
+        Image that contains the lines as numpy array
+    thresholds:
+        list of thresholds
+    bins:
+        number of bins or bin edges of the length histograms. The bin edges are shared
+        by all thresholds.
+    maxGap, lengthSlack:
+        see findLines(...)
+
+    return:
+        list with one entry per threshold (in the given order). Every entry is a dict with
+            'threshold': the threshold
+            'lines': list of lines as numpy array [x1,y1,x2,y2] (see findLines(...))
+            'lineCount': number of lines
+            'histogram': histogram of the line lengths
+            'binEdges': bin edges of the histogram
+    """
+    if image is None:
+        raise ValueError("Image must be set" )
+
+    if maxGap < 0 or lengthSlack < 0:
+        raise ValueError("maxGap and lengthSlack must not be negative")
+
+    image = numpy.asarray(image)
+    values = image.reshape(-1)
+    order = numpy.argsort(values, kind="stable")
+    sortedValues = values[order]
+
+    mask = numpy.zeros(image.shape, dtype=bool)
+    maskValues = mask.reshape(-1)
+    runs = _RunTables(mask, maxGap=maxGap)
+
+    results = [None] * len(thresholds)
+    lines = None
+    numSet = 0
+
+    for k in sorted(range(len(thresholds)), key=lambda k: thresholds[k], reverse=True):
+        # the pixels above the threshold are the tail of the sorted values
+        first = numpy.searchsorted(sortedValues, thresholds[k], side="right")
+
+        if None == lines or len(values) - first > numSet:
+            newPixels = order[first:len(values) - numSet]
+            maskValues[newPixels] = True
+            numSet = len(values) - first
+
+            # only the runs of the rows and columns with new pixels change
+            runs.updateRows(numpy.unique(newPixels // image.shape[1]))
+            runs.updateColumns(numpy.unique(newPixels % image.shape[1]))
+
+            lineSegments = _scanLines(runs, VisitedMatrix(mask), _iterMaskRows(mask), lengthSlack=lengthSlack)
+            lines = transformLineSegmentsIntoNumpyArray(lineSegments)
+
+        results[k] = {"threshold": thresholds[k], "lines": list(lines), "lineCount": len(lines)}
+
+    lengths = [_getLineLengths(result["lines"]) for result in results]
+
+    if 0 == numpy.ndim(bins):
+        maxLength = max([1.0] + [l.max() for l in lengths if len(l) > 0])
+        bins = numpy.linspace(0.0, maxLength, bins + 1)
+
+    for (result, l) in zip(results, lengths):
+        (result["histogram"], result["binEdges"]) = numpy.histogram(l, bins=bins)
+
+    return results
+
+def _buildBandMask(band, isLineColor):
+    """
+    Returns the boolean mask of the line pixels of an image band. Packed bands are
+    unpacked, so the mask needs one byte per pixel.
+    """
+    if isinstance(band, PackedBinaryImage):
+        return numpy.unpackbits(band.packedRows, axis=1)[:, :band.shape[1]].astype(bool)
+
+    if None == isLineColor:
+        return 0 != band
+
+    mask = numpy.asarray(isLineColor(band))
+    if not mask.shape == band.shape:
+        raise ValueError("isLineColor(_color) must accept numpy arrays to detect lines in bands")
+
+    return mask.astype(bool)
+
+class _BandCoverage(object):
+    """
+    Visited matrix of the lines tracked for one band of the image. It counts for
+    every pixel of the band the lines that cover it and records the visited spans
+    [y1,y2,x1,x2] of all lines, also the parts below the band.
+    """
+    y1 = 0
+    y2 = 0
+    counts = None
+    spans = None
+
+    def __init__(self, y1, y2, width):
+        self.y1 = y1
+        self.y2 = y2
+        self.counts = numpy.zeros((y2 - y1, width), dtype=numpy.uint16)
+        self.spans = []
+
+    def isVisited(self, x, y):
+        return 0 != self.counts[y - self.y1, x]
+
+    def _addSpan(self, y1, y2, x1, x2):
+        self.spans.append((y1, y2, x1, x2))
+
+        (y1, y2) = (max(y1, self.y1), min(y2, self.y2 - 1))
+        if y1 <= y2:
+            self.counts[y1 - self.y1:y2 - self.y1 + 1, x1:x2 + 1] += 1
+
+    def setRowVisited(self, y, x1, x2):
+        self._addSpan(y, y, min(x1, x2), max(x1, x2))
+
+    def setColumnVisited(self, x, y1, y2):
+        self._addSpan(min(y1, y2), max(y1, y2), x, x)
+
+def _trackBand(task):
+    """
+    Tracks the lines that start in the rows y1 ... y2-1 as if no line started above
+    the band. The lines may continue below the band.
+    return:
+        (lines (n,4), spans [y1,y2,x1,x2] of all lines, offsets of the spans of every
+        line, number of lines that cover every pixel of the band)
+    """
+    (runs, y1, y2, lengthSlack) = task
+
+    coverage = _BandCoverage(y1, y2, runs.shape[1])
+    lines = []
+    offsets = [0]
+    for lineSegment in _scanLines(runs, coverage, _iterMaskRows(runs.mask, y1, y2), lengthSlack=lengthSlack):
+        lines.append(lineSegment.getAsNumpyArray())
+        offsets.append(len(coverage.spans))
+
+    lines = numpy.array(lines, dtype=numpy.int64).reshape(-1, 4)
+    spans = numpy.array(coverage.spans, dtype=numpy.int64).reshape(-1, 4)
+
+    return (lines, spans, numpy.array(offsets, dtype=numpy.int64), coverage.counts)
+
+# run tables of the whole image, shared with the worker processes of findLinesParallel
+_sharedRuns = None
+
+def _initBandWorker(mask, rowStart, rowEnd, columnEnd, shape, maxGap):
+    """
+    Initializes a worker process of findLinesParallel(...) with the shared run tables
+    """
+    global _sharedRuns
+
+    tables = [numpy.frombuffer(table, dtype=numpy.int32).reshape(shape) for table in (rowStart, rowEnd, columnEnd)]
+    _sharedRuns = _RunTables(numpy.frombuffer(mask, dtype=numpy.bool_).reshape(shape), maxGap, *tables)
+
+def _trackSharedBand(task):
+    """
+    Tracks the lines of a band (see _trackBand(...)) with the shared run tables
+    """
+    return _trackBand((_sharedRuns,) + task)
+
+def _shareArray(array, ctype):
+    """
+    Copies the numpy array into shared memory
+    """
+    shared = multiprocessing.sharedctypes.RawArray(ctype, array.size)
+    numpy.frombuffer(shared, dtype=array.dtype)[:] = array.reshape(-1)
+
+    return shared
+
+def _markSpans(covered, spans, y_min=0):
+    """
+    Marks the pixels of the spans [y1,y2,x1,x2] in the rows from y_min on as covered
+    """
+    for (y1, y2, x1, x2) in spans[spans[:, 1] >= y_min].tolist():
+        covered[max(y1, y_min):y2 + 1, x1:x2 + 1] = True
+
+def _joinBand(runs, covered, y1, y2, band, lengthSlack=0):
+    """
+    Returns the lines (n,4) that the serial scan finds in the band, given the tracked lines
+    of the band (see _trackBand(...)) and the pixels 'covered' by the lines that
+    started above the band.
+
+    The lines of the band are the lines of the serial scan as long as their start
+    pixels are not covered. A line whose start pixel is covered is dropped and the
+    line pixels that only it covered are scanned again, as the serial scan would do.
+    'covered' is updated with the lines that continue below the band.
+    """
+    (lines, spans, offsets, counts) = band
+    width = runs.shape[1]
+    starts = spans[offsets[:-1]][:, [0, 2]]
+    startKeys = starts[:, 0] * width + starts[:, 1]
+    lineOfSpan = numpy.repeat(numpy.arange(len(lines)), numpy.diff(offsets))
+
+    # pixels (y, x, line of the band) to handle in the order of the serial scan: the
+    # start pixels of dropped lines and the pixels to scan again (line -1)
+    dropped = covered[starts[:, 0], starts[:, 1]]
+    heap = [(y, x, i) for (i, (y, x)) in zip(numpy.flatnonzero(dropped).tolist(), starts[dropped].tolist())]
+    rescanned = set()
+    newLines = []
+    newKeys = []
+
+    while len(heap) > 0:
+        (y, x, i) = heapq.heappop(heap)
+
+        if -1 == i:
+            if covered[y, x] or 0 != counts[y - y1, x]:
+                continue
+
+            coverage = _BandCoverage(y2, y2, width)
+            newLines.append(_trackLine(runs, coverage, x, y, lengthSlack=lengthSlack).getAsNumpyArray())
+            newKeys.append(y * width + x)
+            lineSpans = numpy.array(coverage.spans, dtype=numpy.int64).reshape(-1, 4)
+            _markSpans(covered, lineSpans)
+
+            # lines of the band that start on pixels covered by the new line are dropped
+            (first, last) = numpy.searchsorted(startKeys, (y * width + x, (lineSpans[:, 1].max() + 1) * width))
+            nowDropped = covered[starts[first:last, 0], starts[first:last, 1]] & ~dropped[first:last]
+            dropped[first:last] |= nowDropped
+            for i in (first + numpy.flatnonzero(nowDropped)).tolist():
+                heapq.heappush(heap, (int(starts[i, 0]), int(starts[i, 1]), i))
+
+            continue
+
+        for (s1, s2, x1, x2) in spans[offsets[i]:offsets[i + 1]].tolist():
+            (s1, s2) = (max(s1, y1), min(s2, y2 - 1))
+            if s1 > s2:
+                continue
+
+            counts[s1 - y1:s2 - y1 + 1, x1:x2 + 1] -= 1
+
+            # pixels that are still covered are pushed again by the line that covers them
+            # when it is dropped as well
+            uncovered = runs.mask[s1:s2 + 1, x1:x2 + 1] & ~covered[s1:s2 + 1, x1:x2 + 1] & (0 == counts[s1 - y1:s2 - y1 + 1, x1:x2 + 1])
+            for (dy, dx) in zip(*numpy.nonzero(uncovered)):
+                pixel = (s1 + int(dy), x1 + int(dx))
+                if not pixel in rescanned:
+                    rescanned.add(pixel)
+                    heapq.heappush(heap, pixel + (-1,))
+
+    _markSpans(covered, spans[~dropped[lineOfSpan]], y_min=y2)
+
+    keys = numpy.concatenate((startKeys[~dropped], numpy.array(newKeys, dtype=numpy.int64)))
+    joined = numpy.concatenate((lines[~dropped], numpy.array(newLines, dtype=numpy.int64).reshape(-1, 4)))
+
+    return joined[numpy.argsort(keys, kind="stable")]
+
+def _splitRange(length, parts):
+    """
+    Returns the borders of up to 'parts' nearly equal, non empty slices of range(length)
+    """
+    return sorted(set(numpy.linspace(0, length, max(1, parts) + 1).astype(int).tolist()))
+
+def _findLinesParallel(image, isLineColor=None, backend="serial", bands=8, workers=None, maxGap=0, lengthSlack=0):
+    """
+    Detects lines in the given image by tracking the lines of horizontal bands in
+    parallel. Every band is tracked as if no line started above it, the lines may
+    continue into the bands below. Afterwards the bands are joined from top to bottom:
+    lines that start on pixels covered by lines from above are dropped and the pixels
+    they covered are scanned again. The result equals the one of _findLines(...) for
+    every number of bands.
+    image:
+        Image that contains the lines as numpy array or PackedBinaryImage
+    isLineColor(_color):
+        A function that determines whether a given pixel color value '_color' is part of 
+        a line. It is applied on the whole image, so it must accept numpy arrays, e.g.:
+
+            mean = image.mean()
+            isLineColor(_color):
+                return _color > mean
+
+        For binary images (bool, uint8 or PackedBinaryImage) it can be omitted.
+    backend:
+        'serial' tracks the bands one after the other, 'processes' in a process pool.
+        'threads' uses a thread pool, but the tracking holds the GIL, so it does not
+        run faster than 'serial'.
+    bands:
+        number of bands
+    workers:
+        number of threads or processes, defaults to the number of CPUs
+    maxGap, lengthSlack:
+        see findLines(...)
+
+    return:
+        list of lines as LineSegment
+    """
+    if image is None:
+        raise ValueError("Image must be set" )
+
+    if None == isLineColor and not isBinaryImage(image):
+        raise ValueError("isLineColor(_color) not set")
+
+    if not backend in ("serial", "threads", "processes"):
+        raise ValueError("backend must be 'serial', 'threads' or 'processes'")
+
+    if maxGap < 0 or lengthSlack < 0:
+        raise ValueError("maxGap and lengthSlack must not be negative")
+
+    if None == workers:
+        workers = multiprocessing.cpu_count()
+
+    runs = _RunTables(_buildBandMask(image, isLineColor), maxGap=maxGap)
+    borders = _splitRange(image.shape[0], bands)
+    tasks = [(y1, y2, lengthSlack) for (y1, y2) in zip(borders[:-1], borders[1:])]
+
+    if "serial" == backend or len(tasks) < 2:
+        results = [_trackBand((runs,) + task) for task in tasks]
+    elif "threads" == backend:
+        pool = multiprocessing.pool.ThreadPool(workers)
+        try:
+            results = pool.map(_trackBand, [(runs,) + task for task in tasks], chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        shared = [_shareArray(runs.mask, ctypes.c_bool)]
+        shared += [_shareArray(table, ctypes.c_int32) for table in (runs.rowStart, runs.rowEnd, runs.columnEnd)]
+        pool = multiprocessing.Pool(workers, initializer=_initBandWorker, initargs=tuple(shared) + (runs.shape, maxGap))
+        try:
+            results = pool.map(_trackSharedBand, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    # pixels covered by lines that started in a band above the pixel
+    covered = numpy.zeros(runs.shape, dtype=bool)
+    lines = []
+    for ((y1, y2, _), band) in zip(tasks, results):
+        if len(band[0]) > 0:
+            lines.extend(_joinBand(runs, covered, y1, y2, band, lengthSlack=lengthSlack).tolist())
+
+    return [LineSegment(*line) for line in lines]
+
+def findLinesParallel(image, isLineColor=None, backend="serial", bands=8, workers=None, maxGap=0, lengthSlack=0):
+    """
+    Detects lines in the given image band-parallel (see _findLinesParallel(...)) and
+    returns them as a list
     return:
         list of lines as numpy array [x1,y1,x2,y2]
     """
-    lines = _findLines(image, isLineColor=isLineColor)
+    lines = _findLinesParallel(image, isLineColor=isLineColor, backend=backend, bands=bands, workers=workers, maxGap=maxGap, lengthSlack=lengthSlack)
 
     return transformLineSegmentsIntoNumpyArray(lines)
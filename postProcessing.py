@@ -8,7 +8,11 @@ Post processing functionalities:
 # Date created: 10/30/2015
 # Python version: 2.7
 """
+import ctypes
 import math
+import multiprocessing
+import multiprocessing.sharedctypes
+import numpy
 from lineFinding import LineSegment
 
 class Structure(object):
@@ -96,6 +100,331 @@ class Structure(object):
 
 		return lines
 
+def _asEndpointArray(lines, dtype=numpy.int64):
+	"""
+	Returns the given lines as (N,4) numpy array of the form [[x1,y1,x2,y2],...]
+	(integer by default). 'lines' can be a list of LineSegments, a list of
+	numpy arrays [x1,y1,x2,y2] (as returned by lineFinding.findLines) or
+	a (N,4) numpy array.
+	"""
+	if isinstance(lines, numpy.ndarray):
+		endpoints = lines.astype(dtype).reshape(-1, 4)
+	else:
+		rows = []
+		for line in lines:
+			if isinstance(line, LineSegment):
+				rows.append((line.x_start, line.y_start, line.x_end, line.y_end))
+			else:
+				rows.append(tuple(line))
+
+		endpoints = numpy.array(rows, dtype=dtype).reshape(-1, 4)
+
+	return endpoints
+
+def _findAdjacentPointPairs(points, delta=1):
+	"""
+	Snaps the given points (M,2) onto their unique coordinates and returns
+	the pairs of unique coordinates that lie within the delta- neighbourhood
+	of each other.
+	return:
+		(inverse, u, v) where 'inverse' maps every point to its unique coordinate and
+		(u[k], v[k]) are the indices of two adjacent unique coordinates
+	"""
+	if 0 == len(points):
+		empty = numpy.zeros(0, dtype=numpy.int64)
+		return (empty, empty, empty)
+
+	x = points[:, 0] - points[:, 0].min() + delta
+	y = points[:, 1] - points[:, 1].min() + delta
+	stride = int(y.max()) + delta + 1
+
+	# the padding by delta makes sure that shifted keys never alias neighbouring columns
+	keys = x * stride + y
+	uniqueKeys, inverse = numpy.unique(keys, return_inverse=True)
+	inverse = inverse.reshape(-1)
+
+	u = []
+	v = []
+	nodes = numpy.arange(len(uniqueKeys))
+
+	# adjacency is symmetric, so it suffices to probe one half of the neighbourhood
+	for dx in range(0, delta + 1):
+		for dy in range(-delta, delta + 1):
+			if 0 == dx and dy <= 0:
+				continue
+
+			target = uniqueKeys + dx * stride + dy
+			pos = numpy.searchsorted(uniqueKeys, target)
+			found = pos < len(uniqueKeys)
+			found[found] = uniqueKeys[pos[found]] == target[found]
+			u.append(nodes[found])
+			v.append(pos[found])
+
+	return (inverse, numpy.concatenate(u), numpy.concatenate(v))
+
+def _connectedComponents(numNodes, u, v):
+	"""
+	Computes the connected components of the undirected graph with the nodes
+	0 ... numNodes-1 and the edges (u[k], v[k]).
+	return:
+		for every node the smallest node index of its component
+	"""
+	labels = numpy.arange(numNodes)
+
+	# Shiloach-Vishkin: every round hooks the root of a tree onto the smaller root of an
+	# adjacent tree, which at least halves the number of trees per component
+	while True:
+		# pointer jumping until every node points to the root of its tree
+		while True:
+			parents = labels[labels]
+			if numpy.array_equal(parents, labels):
+				break
+			labels = parents
+
+		rootsU = labels[u]
+		rootsV = labels[v]
+		different = rootsU != rootsV
+		if not different.any():
+			return labels
+
+		# roots only point to smaller roots, thus the root of a tree is its smallest node
+		numpy.minimum.at(labels, numpy.maximum(rootsU, rootsV)[different], numpy.minimum(rootsU, rootsV)[different])
+
+def _groupEndpoints(endpoints, delta=1):
+	"""
+	Groups the lines given as (N,4) numpy array into connected components, where
+	two lines are connected if one of their end points lies in the delta- neighbourhood
+	of an end point of the other line (see isAdjacent(...)).
+	return:
+		for every line the index of its component. Components are numbered in the order
+		of their first line.
+	"""
+	numLines = len(endpoints)
+	points = numpy.concatenate((endpoints[:, 0:2], endpoints[:, 2:4]))
+	(inverse, u, v) = _findAdjacentPointPairs(points, delta=delta)
+
+	# nodes 0 ... numLines-1 are the lines, the following nodes their unique end points
+	lineNodes = numpy.arange(numLines)
+	u = numpy.concatenate((lineNodes, lineNodes, u + numLines))
+	v = numpy.concatenate((inverse[:numLines] + numLines, inverse[numLines:] + numLines, v + numLines))
+
+	labels = _connectedComponents(numLines + len(inverse), u, v)[:numLines]
+
+	# every component contains a line, thus its label is the index of its first line
+	return numpy.unique(labels, return_inverse=True)[1].reshape(-1)
+
+class StructureSet(object):
+	"""
+	A set of structures that is stored as index arrays over a shared table
+	of end points. The lines of structure i are
+
+		endpoints[lineIds[offsets[i]:offsets[i+1]]]
+
+	(compressed sparse row layout). In contrast to a list of structures it allows
+	membership tests in constant time and computes statistics of all structures
+	at once.
+	"""
+	endpoints = None
+	offsets = None
+	lineIds = None
+
+	# maps every line to the index of its structure (-1 if it has none)
+	_structureOfLine = None
+	_lines = None
+	_lineIndex = None
+
+	def __init__(self, endpoints, offsets, lineIds, lines=None):
+		"""
+		Constructor
+		endpoints:
+			(N,4) numpy array of all lines [[x1,y1,x2,y2],...]
+		offsets:
+			numpy array of length S+1. Structure i holds the entries offsets[i] to offsets[i+1]-1
+			of 'lineIds'
+		lineIds:
+			indices into 'endpoints'
+		lines:
+			(optional) the LineSegments belonging to the rows of 'endpoints'. If not set, they are
+			created on demand.
+		"""
+		self.endpoints = numpy.asarray(endpoints, dtype=numpy.int64).reshape(-1, 4)
+		self.offsets = numpy.asarray(offsets, dtype=numpy.int64)
+		self.lineIds = numpy.asarray(lineIds, dtype=numpy.int64)
+
+		if 0 == len(self.offsets) or not 0 == self.offsets[0] or not len(self.lineIds) == self.offsets[-1]:
+			raise ValueError("'offsets' does not match 'lineIds'")
+
+		if not None == lines and not len(lines) == len(self.endpoints):
+			raise ValueError("'lines' must hold one LineSegment for every row of 'endpoints'")
+
+		self._structureOfLine = numpy.full(len(self.endpoints), -1, dtype=numpy.int64)
+		self._structureOfLine[self.lineIds] = numpy.repeat(numpy.arange(len(self.offsets) - 1), self.getLineCounts())
+
+		self._lines = lines
+		self._lineIndex = None
+
+	@classmethod
+	def fromStructures(cls, structures):
+		"""
+		Creates a structure set from a list of structures (e.g., the result
+		of groupAdjacentLines(...)). The LineSegments are shared with the structures.
+		"""
+		lines = []
+		counts = []
+		for structure in structures:
+			lines.extend(structure)
+			counts.append(len(structure))
+
+		offsets = numpy.concatenate(([0], numpy.cumsum(counts, dtype=numpy.int64)))
+
+		return cls(_asEndpointArray(lines), offsets, numpy.arange(len(lines)), lines=lines)
+
+	@classmethod
+	def fromLines(cls, lines, delta=1):
+		"""
+		Groups the lines into structures as groupAdjacentLines(...) does, but
+		vectorized over all end points.
+		lines:
+			list of LineSegments, list of numpy arrays [x1,y1,x2,y2] or (N,4) numpy array
+		delta:
+			Range of the neighbour in which we consider a line as adjacent
+		return:
+			A StructureSet. Structures are ordered by their first line, lines within
+			a structure keep their order in 'lines'.
+		"""
+		endpoints = _asEndpointArray(lines)
+		labels = _groupEndpoints(endpoints, delta=delta)
+
+		lineIds = numpy.argsort(labels, kind="stable")
+		counts = numpy.bincount(labels)
+		offsets = numpy.concatenate(([0], numpy.cumsum(counts, dtype=numpy.int64)))
+
+		segments = None
+		if not isinstance(lines, numpy.ndarray) and all(isinstance(line, LineSegment) for line in lines):
+			segments = list(lines)
+
+		return cls(endpoints, offsets, lineIds, lines=segments)
+
+	def __len__(self):
+		"""
+		Overload len(...), returns the number of structures
+		"""
+		return len(self.offsets) - 1
+
+	def __iter__(self):
+		"""
+		Overload iteration, yields every structure as postProcessing.Structure
+		"""
+		for i in range(len(self)):
+			yield self[i]
+
+	def __getitem__(self, key):
+		"""
+		Overload structureSet[...], returns the structure as postProcessing.Structure.
+		The structure is a view holding the LineSegments of this set, changes to the
+		structure itself are not reflected in the set.
+		"""
+		if key < 0:
+			key += len(self)
+
+		if key < 0 or key >= len(self):
+			raise IndexError("structure index out of range")
+
+		lines = self.getLines()
+		structure = Structure()
+		for lineId in self.getLineIds(key):
+			structure.append(lines[lineId])
+
+		return structure
+
+	def __contains__(self, item):
+		"""
+		Overload contains. 'item' can be a LineSegment or the index of a line
+		in 'endpoints'.
+		"""
+		return self.structureOf(item) >= 0
+
+	def structureOf(self, item):
+		"""
+		Returns the index of the structure that contains the line 'item' (LineSegment
+		or index of a line in 'endpoints') or -1 if no structure contains it.
+		"""
+		if isinstance(item, LineSegment):
+			if None == self._lineIndex:
+				self._lineIndex = dict((id(line), i) for (i, line) in enumerate(self.getLines()))
+
+			lineId = self._lineIndex.get(id(item), -1)
+		elif isinstance(item, (int, numpy.integer)):
+			lineId = int(item)
+		else:
+			return -1
+
+		if lineId < 0 or lineId >= len(self._structureOfLine):
+			return -1
+
+		return int(self._structureOfLine[lineId])
+
+	def getLines(self):
+		"""
+		Returns the list of all LineSegments (one for every row of 'endpoints')
+		"""
+		if None == self._lines:
+			self._lines = [LineSegment(*row) for row in self.endpoints]
+
+		return self._lines
+
+	def getLineIds(self, i):
+		"""
+		Returns the indices of the lines of structure i
+		"""
+		return self.lineIds[self.offsets[i]:self.offsets[i+1]]
+
+	def getEndpoints(self, i):
+		"""
+		Returns the lines of structure i as (n,4) numpy array [[x1,y1,x2,y2],...]
+		"""
+		return self.endpoints[self.getLineIds(i)]
+
+	def getLineCounts(self):
+		"""
+		Returns the number of lines of every structure
+		"""
+		return numpy.diff(self.offsets)
+
+	def getBoundingBoxes(self):
+		"""
+		Returns the bounding box of every structure as (S,4) numpy array
+		[[x_min,y_min,x_max,y_max],...]. Empty structures get the box [0,0,0,0].
+		"""
+		boxes = numpy.zeros((len(self), 4), dtype=numpy.int64)
+		nonEmpty = self.getLineCounts() > 0
+
+		if nonEmpty.any():
+			lines = self.endpoints[self.lineIds]
+			starts = self.offsets[:-1][nonEmpty]
+			xs = numpy.minimum(lines[:, 0], lines[:, 2])
+			ys = numpy.minimum(lines[:, 1], lines[:, 3])
+			boxes[nonEmpty, 0] = numpy.minimum.reduceat(xs, starts)
+			boxes[nonEmpty, 1] = numpy.minimum.reduceat(ys, starts)
+			xs = numpy.maximum(lines[:, 0], lines[:, 2])
+			ys = numpy.maximum(lines[:, 1], lines[:, 3])
+			boxes[nonEmpty, 2] = numpy.maximum.reduceat(xs, starts)
+			boxes[nonEmpty, 3] = numpy.maximum.reduceat(ys, starts)
+
+		return boxes
+
+	def getTotalLengths(self):
+		"""
+		Returns the summed up line length of every structure. The length of a line
+		is computed as in LineSegment.getLineLength().
+		"""
+		lines = self.endpoints[self.lineIds]
+		a = (numpy.abs(lines[:, 2] - lines[:, 0]) + 1) ** 2
+		b = (numpy.abs(lines[:, 3] - lines[:, 1]) + 1) ** 2
+		cumulative = numpy.concatenate(([0.0], numpy.cumsum(numpy.sqrt(a + b))))
+
+		return cumulative[self.offsets[1:]] - cumulative[self.offsets[:-1]]
+
 def getAdjacentCoordinates(x, y, delta=1):
 	"""
 	Returns the coordinates of the points in the
@@ -211,6 +540,449 @@ def groupAdjacentLines(lines, delta=1):
 
 	return structures 
 
+def _iterBatchLines(lines):
+	"""
+	Yields the lines of an iterable that may hold batches of lines [[x1,y1,x2,y2],...]
+	one by one
+	"""
+	for line in lines:
+		if isinstance(line, numpy.ndarray) and 2 == line.ndim:
+			for row in line:
+				yield row
+		else:
+			yield line
+
+class IncrementalGrouper(object):
+	"""
+	Groups lines into structures while they arrive in batches (e.g., from tiles
+	or frames). The grouper keeps an index of the end points and the components
+	across calls, so that an update only touches the lines and structures in the
+	neighbourhood of the batch.
+	"""
+	delta = 1
+
+	# line id -> LineSegment
+	_lines = None
+	# id(LineSegment) -> line id
+	_lineIds = None
+	# line id -> distinct end points (x, y) of the line at the time it was added
+	_endpoints = None
+	# (x, y) -> set of line ids that have an end point at (x, y)
+	_endpointIndex = None
+	# line id -> component id
+	_componentOf = None
+	# component id -> set of line ids
+	_components = None
+	_nextLineId = 0
+	_nextComponentId = 0
+
+	def __init__(self, delta=1):
+		"""
+		Constructor
+		delta:
+			Range of the neighbour in which we consider a line as adjacent
+		"""
+		self.delta = delta
+		self._lines = {}
+		self._lineIds = {}
+		self._endpoints = {}
+		self._endpointIndex = {}
+		self._componentOf = {}
+		self._components = {}
+		self._nextLineId = 0
+		self._nextComponentId = 0
+
+	def __len__(self):
+		"""
+		Overload len(...), returns the number of structures
+		"""
+		return len(self._components)
+
+	def __contains__(self, line):
+		"""
+		Overload contains
+		"""
+		return id(line) in self._lineIds
+
+	def _getEndpoints(self, lineId):
+		return self._endpoints[lineId]
+
+	def _findAdjacentLines(self, lineId):
+		"""
+		Returns the ids of all lines that are adjacent to the line 'lineId'
+		"""
+		adjacent = set()
+		for (x, y) in self._getEndpoints(lineId):
+			for point in getAdjacentCoordinates(x, y, delta=self.delta):
+				adjacent.update(self._endpointIndex.get(tuple(point), ()))
+
+		adjacent.discard(lineId)
+		return adjacent
+
+	def _newComponent(self, lineIds):
+		componentId = self._nextComponentId
+		self._nextComponentId += 1
+		self._components[componentId] = lineIds
+		for lineId in lineIds:
+			self._componentOf[lineId] = componentId
+
+		return componentId
+
+	def add(self, lines):
+		"""
+		Adds the lines to the grouping. Lines that are adjacent to existing structures
+		are merged into them and structures that become connected are joined.
+		lines:
+			iterable of LineSegments, numpy arrays [x1,y1,x2,y2] or batches of lines as
+			numpy arrays [[x1,y1,x2,y2],...] (e.g., from lineFinding.iterLines(...))
+		return:
+			list of the LineSegments that were added
+		"""
+		added = []
+		for line in _iterBatchLines(lines):
+			if not isinstance(line, LineSegment):
+				line = LineSegment(*line)
+
+			if id(line) in self._lineIds:
+				continue
+
+			lineId = self._nextLineId
+			self._nextLineId += 1
+			self._lines[lineId] = line
+			self._lineIds[id(line)] = lineId
+
+			# the grouping refers to the coordinates at this point, later changes of the
+			# LineSegment (e.g., by combineLinesWithEqualSlope) do not affect it
+			start = (int(line.x_start), int(line.y_start))
+			end = (int(line.x_end), int(line.y_end))
+			self._endpoints[lineId] = (start,) if start == end else (start, end)
+
+			for point in self._getEndpoints(lineId):
+				self._endpointIndex.setdefault(point, set()).add(lineId)
+
+			components = set(self._componentOf[other] for other in self._findAdjacentLines(lineId))
+
+			if 0 == len(components):
+				self._newComponent(set([lineId]))
+			else:
+				# join into the largest component to move as few lines as possible
+				target = max(components, key=lambda c: len(self._components[c]))
+				self._components[target].add(lineId)
+				self._componentOf[lineId] = target
+
+				for component in components:
+					if component == target:
+						continue
+
+					lineIds = self._components.pop(component)
+					for other in lineIds:
+						self._componentOf[other] = target
+
+					self._components[target].update(lineIds)
+
+			added.append(line)
+
+		return added
+
+	def remove(self, lines):
+		"""
+		Removes the lines from the grouping. Structures that lose their connection
+		are split up.
+		lines:
+			iterable of LineSegments that were added before
+		"""
+		# check the whole batch before anything is changed
+		lineIds = []
+		seen = set()
+		for line in lines:
+			lineId = self._lineIds.get(id(line))
+			if None == lineId:
+				raise ValueError("line " + str(line) + " is not part of the grouping")
+
+			if not lineId in seen:
+				seen.add(lineId)
+				lineIds.append(lineId)
+
+		removedEndpoints = []
+		affected = set()
+		for lineId in lineIds:
+			del self._lineIds[id(self._lines[lineId])]
+
+			for point in self._endpoints[lineId]:
+				ids = self._endpointIndex[point]
+				ids.discard(lineId)
+				if 0 == len(ids):
+					del self._endpointIndex[point]
+
+			removedEndpoints.extend(self._endpoints.pop(lineId))
+
+			componentId = self._componentOf.pop(lineId)
+			self._components[componentId].discard(lineId)
+			affected.add(componentId)
+			del self._lines[lineId]
+
+		# the remaining lines next to the removed ones, grouped by their structure
+		seeds = dict((componentId, set()) for componentId in affected)
+		for (x, y) in removedEndpoints:
+			for point in getAdjacentCoordinates(x, y, delta=self.delta):
+				for other in self._endpointIndex.get(tuple(point), ()):
+					seeds[self._componentOf[other]].add(other)
+
+		for componentId in affected:
+			if 0 == len(self._components[componentId]):
+				del self._components[componentId]
+			else:
+				self._splitComponent(componentId, sorted(seeds[componentId]))
+
+	def _splitComponent(self, componentId, seeds):
+		"""
+		Splits off the parts of the component that lost their connection to the rest.
+		A search is started from every seed and the searches advance in turns. Searches
+		that meet are joined, a search that runs out of lines has found a part that is
+		split off into a new component. It stops as soon as one search is left, so the
+		cost depends on the size of the parts that are split off and not on the size
+		of the structure.
+		"""
+		# line id -> search, search -> lines found, search -> lines to expand
+		owner = {}
+		found = {}
+		stacks = {}
+		for seed in seeds:
+			owner[seed] = seed
+			found[seed] = set([seed])
+			stacks[seed] = [seed]
+
+		while len(stacks) > 1:
+			for search in list(stacks):
+				if not search in stacks or 1 == len(stacks):
+					continue
+
+				if 0 == len(stacks[search]):
+					del stacks[search]
+					lineIds = found.pop(search)
+					self._components[componentId].difference_update(lineIds)
+					self._newComponent(lineIds)
+					continue
+
+				for other in self._findAdjacentLines(stacks[search].pop()):
+					otherSearch = owner.get(other)
+					if None == otherSearch:
+						owner[other] = search
+						found[search].add(other)
+						stacks[search].append(other)
+					elif not otherSearch == search:
+						# join the smaller search into the larger one
+						if len(found[search]) < len(found[otherSearch]):
+							(search, otherSearch) = (otherSearch, search)
+
+						for lineId in found[otherSearch]:
+							owner[lineId] = search
+
+						found[search].update(found.pop(otherSearch))
+						stacks[search].extend(stacks.pop(otherSearch))
+
+	def structureOf(self, line):
+		"""
+		Returns the lines of the structure that contains 'line' as postProcessing.Structure
+		"""
+		lineId = self._lineIds.get(id(line))
+		if None == lineId:
+			raise ValueError("line " + str(line) + " is not part of the grouping")
+
+		return self._createStructure(self._components[self._componentOf[lineId]])
+
+	def _createStructure(self, lineIds):
+		structure = Structure()
+		for lineId in sorted(lineIds):
+			structure.append(self._lines[lineId])
+
+		return structure
+
+	def getStructures(self):
+		"""
+		Returns the current structures as list of postProcessing.Structure. Structures
+		are ordered by their oldest line, lines by the order in which they were added.
+		"""
+		components = sorted(self._components.values(), key=min)
+		return [self._createStructure(lineIds) for lineIds in components]
+
+	def getStructureSet(self):
+		"""
+		Returns the current structures as postProcessing.StructureSet
+		"""
+		return StructureSet.fromStructures(self.getStructures())
+
+class JunctionGraph(object):
+	"""
+	Graph whose nodes are the junctions (end points, corners, T-joints, ...) of a
+	drawing and whose edges are the line segments between them. The adjacency is
+	stored in compressed sparse row (CSR) form: the edges at node i are the entries
+	indptr[i] to indptr[i+1]-1 of 'indices' (the node at the other end) and
+	'edgeSegments' (the index of the segment). Every segment appears once at both
+	of its nodes, so a segment whose end points snap into the same node appears
+	twice at that node.
+	"""
+	# (V,2) coordinates [x, y] of the nodes (mean of the snapped end points)
+	nodeCoordinates = None
+	indptr = None
+	indices = None
+	edgeSegments = None
+	# number of edges at every node
+	degrees = None
+	# (N,2) nodes at the start and the end point of every segment
+	segmentNodes = None
+
+	def __init__(self, nodeCoordinates, segmentNodes):
+		"""
+		Constructor
+		nodeCoordinates:
+			(V,2) numpy array of node coordinates
+		segmentNodes:
+			(N,2) numpy array holding the nodes at the start and end point of every segment
+		"""
+		self.nodeCoordinates = numpy.asarray(nodeCoordinates, dtype=numpy.float64).reshape(-1, 2)
+		self.segmentNodes = numpy.asarray(segmentNodes, dtype=numpy.int64).reshape(-1, 2)
+
+		numNodes = len(self.nodeCoordinates)
+		numSegments = len(self.segmentNodes)
+		segments = numpy.arange(numSegments)
+
+		rows = numpy.concatenate((self.segmentNodes[:, 0], self.segmentNodes[:, 1]))
+		columns = numpy.concatenate((self.segmentNodes[:, 1], self.segmentNodes[:, 0]))
+		order = numpy.argsort(rows, kind="stable")
+
+		self.degrees = numpy.bincount(rows, minlength=numNodes)
+		self.indptr = numpy.concatenate(([0], numpy.cumsum(self.degrees)))
+		self.indices = columns[order]
+		self.edgeSegments = numpy.concatenate((segments, segments))[order]
+
+	def __len__(self):
+		"""
+		Overload len(...), returns the number of nodes
+		"""
+		return len(self.nodeCoordinates)
+
+	def getNeighbours(self, node):
+		"""
+		Returns the nodes that are connected to 'node' by a segment
+		"""
+		return self.indices[self.indptr[node]:self.indptr[node+1]]
+
+	def getSegments(self, node):
+		"""
+		Returns the indices of the segments that meet at 'node'
+		"""
+		return self.edgeSegments[self.indptr[node]:self.indptr[node+1]]
+
+def _constrainedComponents(coordinates, startOfSegment, endOfSegment, u, v):
+	"""
+	Joins the adjacent coordinates (u[k], v[k]) into components, the closest pairs
+	first, but skips every pair whose components hold the two ends of the same segment.
+	coordinates:
+		(M,2) unique end point coordinates
+	startOfSegment, endOfSegment:
+		indices of the coordinates of the start and the end points of the segments that
+		constrain the union
+	return:
+		for every coordinate the smallest coordinate index of its component
+	"""
+	parents = list(range(len(coordinates)))
+
+	# component root -> segments with an end point in the component
+	segments = {}
+	for (segment, (start, end)) in enumerate(zip(startOfSegment.tolist(), endOfSegment.tolist())):
+		segments.setdefault(start, set()).add(segment)
+		segments.setdefault(end, set()).add(segment)
+
+	def findRoot(node):
+		while not parents[node] == node:
+			parents[node] = parents[parents[node]]
+			node = parents[node]
+		return node
+
+	distances = ((coordinates[u] - coordinates[v]) ** 2).sum(axis=1)
+	order = numpy.lexsort((v, u, distances))
+	for (nodeU, nodeV) in zip(u[order].tolist(), v[order].tolist()):
+		rootU = findRoot(nodeU)
+		rootV = findRoot(nodeV)
+		if rootU == rootV:
+			continue
+
+		segmentsU = segments.get(rootU, set())
+		segmentsV = segments.get(rootV, set())
+		if not segmentsU.isdisjoint(segmentsV):
+			continue
+
+		# the smaller root becomes the root, the segments are moved into the larger set
+		if rootV < rootU:
+			(rootU, rootV) = (rootV, rootU)
+
+		parents[rootV] = rootU
+		if len(segmentsU) < len(segmentsV):
+			(segmentsU, segmentsV) = (segmentsV, segmentsU)
+
+		segmentsU.update(segmentsV)
+		segments.pop(rootV, None)
+		segments[rootU] = segmentsU
+
+	return _connectedComponents(len(parents), numpy.arange(len(parents)), numpy.array(parents, dtype=numpy.int64))
+
+def buildJunctionGraph(lines, delta=1):
+	"""
+	Snaps the end points of the lines into junction nodes and returns the resulting
+	JunctionGraph. End points that lie within the delta- neighbourhood of each other are
+	snapped into the same node (transitively, as in groupAdjacentLines(...)), except that
+	the two end points of a line never end up in the same node, neither directly nor
+	through the end points of other lines. Where this constraint applies, the closest
+	end points are snapped first. Only lines whose end points are equal become loops.
+	lines:
+		list of LineSegments, list of numpy arrays [x1,y1,x2,y2], (N,4) numpy array,
+		list of structures or StructureSet. The segment indices of the graph refer to
+		the lines in this order (for structures: all lines of the first structure, then
+		of the second, ...; for a StructureSet: the rows of its 'endpoints').
+	delta:
+		Range of the neighbour in which we consider end points as one junction
+	"""
+	if isinstance(lines, StructureSet):
+		endpoints = lines.endpoints
+	elif not isinstance(lines, numpy.ndarray) and len(lines) > 0 and isinstance(lines[0], Structure):
+		endpoints = _asEndpointArray([line for structure in lines for line in structure])
+	else:
+		endpoints = _asEndpointArray(lines)
+
+	numSegments = len(endpoints)
+	points = numpy.concatenate((endpoints[:, 0:2], endpoints[:, 2:4]))
+	(inverse, u, v) = _findAdjacentPointPairs(points, delta=delta)
+	numUnique = numpy.max(inverse, initial=-1) + 1
+
+	labels = _connectedComponents(numUnique, u, v)
+
+	# components that hold both (distinct) end points of a line are snapped again with
+	# a union that never joins the two end points of a line
+	(startOfSegment, endOfSegment) = (inverse[:numSegments], inverse[numSegments:])
+	isLoop = (labels[startOfSegment] == labels[endOfSegment]) & (startOfSegment != endOfSegment)
+	if isLoop.any():
+		conflicting = numpy.isin(labels[u], labels[startOfSegment[isLoop]])
+		coordinates = numpy.zeros((numUnique, 2))
+		coordinates[inverse] = points
+		roots = _constrainedComponents(coordinates, startOfSegment[isLoop], endOfSegment[isLoop], u[conflicting], v[conflicting])
+
+		isConstrained = numpy.isin(labels, labels[startOfSegment[isLoop]])
+		labels[isConstrained] = roots[isConstrained]
+
+	nodeOfPoint = numpy.unique(labels, return_inverse=True)[1].reshape(-1)[inverse]
+
+	numNodes = numpy.max(nodeOfPoint, initial=-1) + 1
+	counts = numpy.bincount(nodeOfPoint, minlength=numNodes)
+	nodeCoordinates = numpy.zeros((numNodes, 2))
+	if numNodes > 0:
+		nodeCoordinates[:, 0] = numpy.bincount(nodeOfPoint, weights=points[:, 0], minlength=numNodes) / counts
+		nodeCoordinates[:, 1] = numpy.bincount(nodeOfPoint, weights=points[:, 1], minlength=numNodes) / counts
+
+	segmentNodes = numpy.stack((nodeOfPoint[:numSegments], nodeOfPoint[numSegments:]), axis=1)
+
+	return JunctionGraph(nodeCoordinates, segmentNodes)
+
 def computeSlope(line):
 	"""
 	Computes and returns the slope of a line
@@ -360,7 +1132,79 @@ def combineLinesWithEqualSlope_Rec(i, structure, angle_epsilon=None, delta=1):
 		combineLinesWithEqualSlope_Rec(i+1, structure, angle_epsilon=angle_epsilon, delta=delta)
 
 
-def combineLinesWithEqualSlope(structures, angle_epsilon=None, delta=1):
+# end points of all structures, shared with the worker processes of combineLinesWithEqualSlope
+_sharedEndpoints = None
+_sharedOffsets = None
+
+def _initCombineWorker(endpoints, offsets):
+	"""
+	Initializes a worker process of combineLinesWithEqualSlope(...) with the shared
+	end points of all structures
+	"""
+	global _sharedEndpoints, _sharedOffsets
+
+	_sharedEndpoints = numpy.frombuffer(endpoints, dtype=numpy.int64).reshape(-1, 4)
+	_sharedOffsets = numpy.frombuffer(offsets, dtype=numpy.int64)
+
+def _combineSharedStructure(task):
+	"""
+	Combines the lines of structure i of the shared end points in a worker process
+	and returns (i, combined lines as (n,4) numpy array)
+	"""
+	(i, angle_epsilon, delta) = task
+
+	structure = Structure()
+	for row in _sharedEndpoints[_sharedOffsets[i]:_sharedOffsets[i+1]]:
+		structure.append(LineSegment(*row))
+
+	combineLinesWithEqualSlope_Rec(0, structure, angle_epsilon=angle_epsilon, delta=delta)
+
+	return (i, numpy.array(structure.transformIntoNumpyArray(), dtype=numpy.int64).reshape(-1, 4))
+
+def _combineLinesWithEqualSlopeParallel(structures, angle_epsilon=None, delta=1, processes=None):
+	"""
+	Runs combineLinesWithEqualSlope_Rec(...) for every structure in a process pool. The
+	end points are passed to the workers as shared arrays, the structures are sent
+	largest first to balance the load.
+	"""
+	structures = list(structures)
+	processedStructures = list(structures)
+
+	# structures with a single line can not be combined
+	tasks = [i for (i, structure) in enumerate(structures) if len(structure) > 1]
+	if 0 == len(tasks):
+		return processedStructures
+
+	lines = []
+	counts = []
+	for structure in structures:
+		lines.extend(structure)
+		counts.append(len(structure))
+
+	endpoints = multiprocessing.sharedctypes.RawArray(ctypes.c_int64, 4 * len(lines))
+	numpy.frombuffer(endpoints, dtype=numpy.int64)[:] = _asEndpointArray(lines).reshape(-1)
+	offsets = multiprocessing.sharedctypes.RawArray(ctypes.c_int64, len(structures) + 1)
+	numpy.frombuffer(offsets, dtype=numpy.int64)[:] = numpy.concatenate(([0], numpy.cumsum(counts)))
+
+	# the pairwise comparisons make the cost grow quadratically with the number of lines
+	tasks.sort(key=lambda i: counts[i], reverse=True)
+
+	pool = multiprocessing.Pool(processes, initializer=_initCombineWorker, initargs=(endpoints, offsets))
+	try:
+		results = pool.imap_unordered(_combineSharedStructure, [(i, angle_epsilon, delta) for i in tasks], chunksize=1)
+		for (i, rows) in results:
+			structure = Structure()
+			for row in rows:
+				structure.append(LineSegment(*row))
+
+			processedStructures[i] = structure
+	finally:
+		pool.close()
+		pool.join()
+
+	return processedStructures
+
+def combineLinesWithEqualSlope(structures, angle_epsilon=None, delta=1, processes=None):
 	"""
 	Combines lines that have equal or similar slope. Thus reduces the amount of lines
 	in a structure for the price of reducing the detailedness.
@@ -368,7 +1212,14 @@ def combineLinesWithEqualSlope(structures, angle_epsilon=None, delta=1):
 		Two lines will be joined if the angle is 180dg (+/- angle_epsilon)
 	delta: 
 		Range of the neighbour in which we consider a line as adjacent
+	processes:
+		If set, the structures are processed in parallel by a pool of 'processes' worker
+		processes (see multiprocessing.Pool). The processed structures are returned in their
+		original order as new structures, the given structures are not modified.
 	"""
+	if not None == processes:
+		return _combineLinesWithEqualSlopeParallel(structures, angle_epsilon=angle_epsilon, delta=delta, processes=processes)
+
 	processedStructures = []
 
 	for structure in structures:
@@ -0,0 +1,276 @@
+"""
+Spatial index over detected lines. The index is a packed R-tree that is bulk
+loaded with the Sort-Tile-Recursive (STR) method and allows to query the lines
+that cross a rectangle, the lines next to a point and the lines within a
+distance of a point.
+
+# Filename: spatialIndex.py
+# Python version: 2.7
+"""
+
+import heapq
+import math
+import numpy
+from postProcessing import _asEndpointArray
+
+def segmentsIntersectBox(segments, x_min, y_min, x_max, y_max):
+    """
+    Tests for every segment [x1,y1,x2,y2] of the (N,4) array 'segments' if it
+    crosses the rectangle (Liang-Barsky clipping). Returns a boolean numpy array.
+    """
+    x1 = segments[:, 0]
+    y1 = segments[:, 1]
+    dx = segments[:, 2] - x1
+    dy = segments[:, 3] - y1
+
+    t0 = numpy.zeros(len(segments))
+    t1 = numpy.ones(len(segments))
+    inside = numpy.ones(len(segments), dtype=bool)
+
+    for (p, q) in ((-dx, x1 - x_min), (dx, x_max - x1), (-dy, y1 - y_min), (dy, y_max - y1)):
+        parallel = 0 == p
+        inside &= ~(parallel & (q < 0))
+
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            r = q / p
+
+        entering = p < 0
+        leaving = p > 0
+        t0 = numpy.where(entering, numpy.maximum(t0, r), t0)
+        t1 = numpy.where(leaving, numpy.minimum(t1, r), t1)
+
+    return inside & (t0 <= t1)
+
+def pointSegmentDistances(segments, x, y):
+    """
+    Returns the euclidean distance of the point (x,y) to every segment [x1,y1,x2,y2]
+    of the (N,4) array 'segments'.
+    """
+    x1 = segments[:, 0]
+    y1 = segments[:, 1]
+    dx = segments[:, 2] - x1
+    dy = segments[:, 3] - y1
+
+    squaredLength = dx * dx + dy * dy
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        t = ((x - x1) * dx + (y - y1) * dy) / squaredLength
+
+    # points (segments of length 0) project onto their start point
+    t = numpy.clip(numpy.where(squaredLength > 0, t, 0.0), 0.0, 1.0)
+
+    return numpy.hypot(x1 + t * dx - x, y1 + t * dy - y)
+
+def _boxDistances(boxes, x, y):
+    """
+    Returns the euclidean distance of the point (x,y) to every box [x_min,y_min,x_max,y_max]
+    of the (N,4) array 'boxes' (0 if the point lies inside the box).
+    """
+    dx = numpy.maximum(numpy.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0.0)
+    dy = numpy.maximum(numpy.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0.0)
+
+    return numpy.hypot(dx, dy)
+
+class SegmentIndex(object):
+    """
+    Packed STR R-tree over line segments.
+
+    The segments are sorted once in STR order and packed into leaves of 'nodeSize'
+    consecutive segments. Every upper level packs 'nodeSize' consecutive nodes of the
+    level below, so the tree is completely described by the arrays 'segments', 'order'
+    and 'levels' and can be pickled or stored with save(...).
+    """
+    nodeSize = 16
+
+    # (N,4) segments [x1,y1,x2,y2] in the order they were given
+    segments = None
+    # indices of the segments in STR order
+    order = None
+    # bounding boxes [x_min,y_min,x_max,y_max] of the nodes, levels[0] are the leaves
+    levels = None
+
+    def __init__(self, lines, nodeSize=16):
+        """
+        Bulk loads the index
+        lines:
+            list of LineSegments, list of numpy arrays [x1,y1,x2,y2] or (N,4) numpy array
+        nodeSize:
+            maximal number of entries of a node
+        """
+        if nodeSize < 2:
+            raise ValueError("nodeSize must be at least 2")
+
+        self.nodeSize = int(nodeSize)
+        self.segments = _asEndpointArray(lines, dtype=numpy.float64)
+        self.order = self._sortTileRecursive(self.segments)
+
+        boxes = numpy.empty((len(self.segments), 4))
+        boxes[:, 0] = numpy.minimum(self.segments[:, 0], self.segments[:, 2])
+        boxes[:, 1] = numpy.minimum(self.segments[:, 1], self.segments[:, 3])
+        boxes[:, 2] = numpy.maximum(self.segments[:, 0], self.segments[:, 2])
+        boxes[:, 3] = numpy.maximum(self.segments[:, 1], self.segments[:, 3])
+        boxes = boxes[self.order]
+
+        self.levels = []
+        while len(boxes) > 0:
+            boxes = self._packBoxes(boxes)
+            self.levels.append(boxes)
+            if 1 == len(boxes):
+                break
+
+    def _sortTileRecursive(self, segments):
+        """
+        Returns the indices of the segments in STR order: the segments are sorted by the
+        x coordinate of their centers, cut into vertical slices and every slice is sorted
+        by the y coordinate of the centers.
+        """
+        numSegments = len(segments)
+        if 0 == numSegments:
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        cx = (segments[:, 0] + segments[:, 2]) / 2.0
+        cy = (segments[:, 1] + segments[:, 3]) / 2.0
+
+        numLeaves = int(math.ceil(numSegments / float(self.nodeSize)))
+        sliceSize = int(math.ceil(math.sqrt(numLeaves))) * self.nodeSize
+
+        byX = numpy.argsort(cx, kind="stable")
+        slices = numpy.arange(numSegments) // sliceSize
+
+        # sort by slice first and by y within the slice
+        return byX[numpy.lexsort((cy[byX], slices))]
+
+    def _packBoxes(self, boxes):
+        """
+        Packs 'nodeSize' consecutive boxes into one node and returns the node boxes
+        """
+        starts = numpy.arange(0, len(boxes), self.nodeSize)
+        packed = numpy.empty((len(starts), 4))
+        packed[:, 0] = numpy.minimum.reduceat(boxes[:, 0], starts)
+        packed[:, 1] = numpy.minimum.reduceat(boxes[:, 1], starts)
+        packed[:, 2] = numpy.maximum.reduceat(boxes[:, 2], starts)
+        packed[:, 3] = numpy.maximum.reduceat(boxes[:, 3], starts)
+
+        return packed
+
+    def __len__(self):
+        """
+        Overload len(...), returns the number of indexed segments
+        """
+        return len(self.segments)
+
+    def _children(self, nodes, numChildren):
+        """
+        Returns the indices of the children of the given nodes
+        """
+        if 0 == len(nodes):
+            return nodes
+
+        children = (nodes[:, None] * self.nodeSize + numpy.arange(self.nodeSize)).reshape(-1)
+        return children[children < numChildren]
+
+    def _searchCandidates(self, isCandidate):
+        """
+        Descends through the tree and returns the indices (into 'segments') of all
+        segments whose bounding box satisfies 'isCandidate(boxes)' (boolean array)
+        and whose parents satisfy it as well.
+        """
+        if 0 == len(self.levels):
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        nodes = numpy.arange(len(self.levels[-1]))
+        for level in range(len(self.levels) - 1, -1, -1):
+            nodes = nodes[isCandidate(self.levels[level][nodes])]
+            numChildren = len(self.order) if 0 == level else len(self.levels[level - 1])
+            nodes = self._children(nodes, numChildren)
+
+        return self.order[nodes]
+
+    def queryBox(self, x_min, y_min, x_max, y_max):
+        """
+        Returns the indices of all segments that cross the rectangle
+        [x_min, x_max] x [y_min, y_max]
+        """
+        def overlaps(boxes):
+            return (boxes[:, 0] <= x_max) & (boxes[:, 2] >= x_min) & (boxes[:, 1] <= y_max) & (boxes[:, 3] >= y_min)
+
+        candidates = self._searchCandidates(overlaps)
+        hits = segmentsIntersectBox(self.segments[candidates], x_min, y_min, x_max, y_max)
+
+        return numpy.sort(candidates[hits])
+
+    def queryRadius(self, x, y, distance):
+        """
+        Returns the indices of all segments whose euclidean distance to the point (x,y)
+        is at most 'distance'
+        """
+        def near(boxes):
+            return _boxDistances(boxes, x, y) <= distance
+
+        candidates = self._searchCandidates(near)
+        hits = pointSegmentDistances(self.segments[candidates], x, y) <= distance
+
+        return numpy.sort(candidates[hits])
+
+    def nearest(self, x, y, k=1):
+        """
+        Returns the k segments next to the point (x,y)
+        return:
+            (indices, distances) as numpy arrays, ordered by increasing distance
+        """
+        indices = []
+        distances = []
+
+        if 0 == len(self.levels) or k < 1:
+            return (numpy.array(indices, dtype=numpy.int64), numpy.array(distances))
+
+        # best first search, entries are (distance, level, index), level -1 marks a segment
+        root = len(self.levels) - 1
+        heap = [(d, root, i) for (i, d) in enumerate(_boxDistances(self.levels[root], x, y))]
+        heapq.heapify(heap)
+
+        while len(heap) > 0 and len(indices) < k:
+            (distance, level, i) = heapq.heappop(heap)
+
+            if -1 == level:
+                indices.append(i)
+                distances.append(distance)
+                continue
+
+            numChildren = len(self.order) if 0 == level else len(self.levels[level - 1])
+            children = self._children(numpy.array([i]), numChildren)
+
+            if 0 == level:
+                segmentIds = self.order[children]
+                childDistances = pointSegmentDistances(self.segments[segmentIds], x, y)
+                for (j, d) in zip(segmentIds, childDistances):
+                    heapq.heappush(heap, (d, -1, int(j)))
+            else:
+                childDistances = _boxDistances(self.levels[level - 1][children], x, y)
+                for (j, d) in zip(children, childDistances):
+                    heapq.heappush(heap, (d, level - 1, int(j)))
+
+        return (numpy.array(indices, dtype=numpy.int64), numpy.array(distances))
+
+    def save(self, fileName):
+        """
+        Stores the index in a numpy .npz file
+        """
+        arrays = dict(("level" + str(i), level) for (i, level) in enumerate(self.levels))
+        numpy.savez_compressed(fileName, segments=self.segments, order=self.order, nodeSize=self.nodeSize, **arrays)
+
+    @classmethod
+    def load(cls, fileName):
+        """
+        Loads an index that was stored with save(...)
+        """
+        index = cls.__new__(cls)
+
+        with numpy.load(fileName) as data:
+            index.nodeSize = int(data["nodeSize"])
+            index.segments = data["segments"]
+            index.order = data["order"]
+            index.levels = []
+            while ("level" + str(len(index.levels))) in data:
+                index.levels.append(data["level" + str(len(index.levels))])
+
+        return index
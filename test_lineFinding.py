@@ -0,0 +1,183 @@
+"""
+Tests of the line finding functionalities
+
+# Filename: test_lineFinding.py
+# Python version: 2.7
+"""
+import unittest
+import numpy
+import lineFinding
+import postProcessing
+
+def createImage(seed, height=60, width=70, numLines=12, noise=0.0):
+    """
+    Returns a binary image with random straight lines and noise pixels
+    """
+    random = numpy.random.RandomState(seed)
+    image = numpy.zeros((height, width), dtype=bool)
+
+    for _ in range(numLines):
+        (x1, x2) = random.randint(0, width, size=2)
+        (y1, y2) = random.randint(0, height, size=2)
+        n = max(abs(x2 - x1), abs(y2 - y1)) + 1
+        xs = numpy.rint(numpy.linspace(x1, x2, n)).astype(int)
+        ys = numpy.rint(numpy.linspace(y1, y2, n)).astype(int)
+        image[ys, xs] = True
+
+    image[random.random_sample(image.shape) < noise] = True
+
+    return image
+
+def asList(lines):
+    return [line.tolist() for line in lines]
+
+class IterLinesTest(unittest.TestCase):
+
+    def testInvalidArgumentsRaiseOnCall(self):
+        image = numpy.zeros((5, 5), dtype=float)
+
+        self.assertRaises(ValueError, lineFinding.iterLines, image)
+        self.assertRaises(ValueError, lineFinding.iterLines, image > 0, batchSize=0)
+        self.assertRaises(ValueError, lineFinding.iterLines, image > 0, maxGap=-1)
+
+    def testBatchesAreChainable(self):
+        image = createImage(0, noise=0.02)
+        lines = lineFinding.filterLines(lineFinding.iterLines(image), minLength=2, skipPoints=True)
+        expected = [line.getAsNumpyArray().tolist() for line in lines]
+
+        batches = lineFinding.filterLines(lineFinding.iterLines(image, batchSize=4), minLength=2, skipPoints=True)
+        self.assertEqual([line for batch in batches for line in asList(batch)], expected)
+
+        grouper = postProcessing.IncrementalGrouper(delta=1)
+        grouper.add(lineFinding.iterLines(image, batchSize=4))
+        self.assertEqual(len(grouper), len(postProcessing.StructureSet.fromLines(lineFinding.findLines(image))))
+
+def packWithSetPadding(image):
+    """
+    Packs the image and sets the padding bits of the last byte of every row
+    """
+    packedRows = numpy.packbits(image, axis=1)
+    padding = (-image.shape[1]) % 8
+    packedRows[:, -1] |= (1 << padding) - 1
+
+    return lineFinding.PackedBinaryImage(packedRows, image.shape[1])
+
+class PackedBinaryImageTest(unittest.TestCase):
+
+    def testRunsAtByteBoundaries(self):
+        random = numpy.random.RandomState(0)
+
+        for width in (1, 7, 8, 9, 15, 16, 17, 31, 40):
+            image = random.random_sample((12, width)) < 0.7
+            image[0] = True
+            image[1, 7::8] = False
+
+            for packed in (lineFinding.packBinaryImage(image), packWithSetPadding(image)):
+                for (y, x) in zip(*numpy.nonzero(image)):
+                    self.assertEqual(packed.findRunEnd(y, x), lineFinding._findRunEnd(image[y], x))
+                    self.assertEqual(packed.findRunStart(y, x), x - lineFinding._findRunEnd(image[y, x::-1], 0))
+                    self.assertEqual(packed.findColumnRunEnd(x, y), lineFinding._findRunEnd(image[:, x], y))
+
+    def testFindLinesEqualsUnpacked(self):
+        for (seed, width) in enumerate((61, 64, 70, 77)):
+            image = createImage(seed, width=width, noise=0.02)
+            expected = asList(lineFinding.findLines(image))
+
+            self.assertEqual(asList(lineFinding.findLines(lineFinding.packBinaryImage(image))), expected)
+            self.assertEqual(asList(lineFinding.findLines(packWithSetPadding(image))), expected)
+            self.assertEqual(asList(lineFinding.findLines(lineFinding.packBinaryImage(image), maxGap=2)), asList(lineFinding.findLines(image, maxGap=2)))
+
+    def testPackedVisitedMatrix(self):
+        image = numpy.zeros((4, 21), dtype=bool)
+        packed = lineFinding.VisitedMatrix(lineFinding.packBinaryImage(image))
+        unpacked = lineFinding.VisitedMatrix(image)
+
+        for visited in (packed, unpacked):
+            visited.setRowVisited(0, 3, 5)
+            visited.setRowVisited(1, 18, 6)
+            visited.setRowVisited(2, 8, 15)
+            visited.setColumnVisited(20, 3, 1)
+            visited.setVisited(0, 3)
+
+        for y in range(image.shape[0]):
+            for x in range(image.shape[1]):
+                self.assertEqual(packed.isVisited(x, y), unpacked.isVisited(x, y))
+
+class BrokenLinesTest(unittest.TestCase):
+
+    def testDefaultsKeepTheOriginalTracking(self):
+        # lines found by the tracker before maxGap and lengthSlack were added
+        expected = [[1, 1, 1, 1], [10, 1, 10, 1], [5, 3, 6, 4], [4, 6, 7, 3], [9, 5, 10, 6], [4, 7, 4, 8],
+                    [10, 7, 10, 9], [3, 8, 10, 8], [12, 8, 12, 8], [2, 9, 2, 11], [2, 10, 10, 9], [14, 9, 14, 9],
+                    [0, 11, 0, 12], [1, 11, 2, 11], [9, 11, 10, 12], [14, 12, 14, 12], [5, 14, 5, 14], [9, 14, 9, 14]]
+        image = createImage(3, height=16, width=18, numLines=4, noise=0.03)
+
+        self.assertEqual(asList(lineFinding.findLines(image)), expected)
+        self.assertEqual(asList(lineFinding.findLines(image, maxGap=0, lengthSlack=0)), expected)
+        self.assertEqual(asList(lineFinding.findLines(image * 200.0, isLineColor=lambda _color: _color > 100)), expected)
+
+    def testDashedHorizontalLine(self):
+        image = numpy.zeros((5, 30), dtype=bool)
+        image[2, 2:28] = True
+        image[2, 6:8] = False
+        image[2, 15] = False
+
+        self.assertEqual(len(lineFinding.findLines(image)), 3)
+        self.assertEqual(asList(lineFinding.findLines(image, maxGap=2)), [[2, 2, 27, 2]])
+        self.assertEqual(len(lineFinding.findLines(image, maxGap=1)), 2)
+
+    def testDashedVerticalLine(self):
+        image = numpy.zeros((30, 5), dtype=bool)
+        image[1:29, 3] = True
+        image[5:7, 3] = False
+        image[20, 3] = False
+
+        self.assertEqual(len(lineFinding.findLines(image)), 3)
+        self.assertEqual(asList(lineFinding.findLines(image, maxGap=2)), [[3, 1, 3, 28]])
+
+    def testRunTablesAgreeWithPixelRuns(self):
+        for seed in range(6):
+            image = createImage(seed, noise=0.05)
+            image[numpy.random.RandomState(seed).random_sample(image.shape) < 0.15] = False
+
+            for (maxGap, lengthSlack) in ((1, 0), (2, 1), (3, 3)):
+                pixelRuns = lineFinding._PixelRuns(image, lineFinding.isNonZeroColor, maxGap=maxGap)
+                runTables = lineFinding._RunTables(image, maxGap=maxGap)
+
+                for (y, x) in zip(*numpy.nonzero(image)):
+                    (x, y) = (int(x), int(y))
+                    self.assertEqual(runTables.findRowEnd(x, y), pixelRuns.findRowEnd(x, y))
+                    self.assertEqual(runTables.findRowStart(x, y), pixelRuns.findRowStart(x, y))
+                    self.assertEqual(runTables.findColumnEnd(x, y), pixelRuns.findColumnEnd(x, y))
+
+                rows = list(lineFinding._iterMaskRows(image))
+                expected = lineFinding._scanLines(pixelRuns, lineFinding.VisitedMatrix(image), rows, lengthSlack=lengthSlack)
+                lines = lineFinding._scanLines(runTables, lineFinding.VisitedMatrix(image), rows, lengthSlack=lengthSlack)
+                self.assertEqual([str(line) for line in lines], [str(line) for line in expected])
+
+class FindLinesParallelTest(unittest.TestCase):
+
+    def testEqualsFindLinesForAnyNumberOfBands(self):
+        for seed in range(4):
+            image = createImage(seed, height=50, width=40, numLines=15, noise=0.03)
+
+            for (maxGap, lengthSlack) in ((0, 0), (2, 1)):
+                expected = asList(lineFinding.findLines(image, maxGap=maxGap, lengthSlack=lengthSlack))
+
+                for bands in (1, 2, 3, 8, 50):
+                    lines = lineFinding.findLinesParallel(image, bands=bands, maxGap=maxGap, lengthSlack=lengthSlack)
+                    self.assertEqual(asList(lines), expected)
+
+    def testBackends(self):
+        image = createImage(0, height=80, width=60, numLines=20, noise=0.02)
+        expected = asList(lineFinding.findLines(image, maxGap=1))
+
+        for backend in ("threads", "processes"):
+            lines = lineFinding.findLinesParallel(image, backend=backend, bands=4, workers=2, maxGap=1)
+            self.assertEqual(asList(lines), expected)
+
+        packed = lineFinding.packBinaryImage(image)
+        self.assertEqual(asList(lineFinding.findLinesParallel(packed, bands=4, maxGap=1)), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Tests of the post processing functionalities
+
+# Filename: test_postProcessing.py
+# Python version: 2.7
+"""
+import unittest
+import numpy
+import lineFinding
+import postProcessing
+from lineFinding import LineSegment
+
+class StructureSetTest(unittest.TestCase):
+
+	def testGroupsLikeGroupAdjacentLines(self):
+		lines = [LineSegment(0, 0, 3, 3), LineSegment(20, 20, 21, 21), LineSegment(4, 4, 9, 9)]
+		structureSet = postProcessing.StructureSet.fromLines(lines, delta=1)
+
+		self.assertEqual([len(structure) for structure in structureSet], [2, 1])
+		self.assertTrue(lines[1] in structureSet)
+		self.assertEqual(structureSet.structureOf(lines[2]), 0)
+
+	def testShuffledChainIsOneStructure(self):
+		numpy.random.seed(0)
+		chain = numpy.array([[i, 0, i, 0] for i in range(20000)])[numpy.random.permutation(20000)]
+
+		structureSet = postProcessing.StructureSet.fromLines(chain, delta=1)
+
+		self.assertEqual(len(structureSet), 1)
+		self.assertEqual(structureSet.getLineCounts()[0], 20000)
+
+class IncrementalGrouperTest(unittest.TestCase):
+
+	def testRemovePointLine(self):
+		grouper = postProcessing.IncrementalGrouper(delta=1)
+		point = LineSegment(1, 5, 1, 5)
+		line = LineSegment(2, 5, 8, 5)
+		grouper.add([point, line])
+		self.assertEqual(len(grouper), 1)
+
+		grouper.remove([point])
+
+		self.assertFalse(point in grouper)
+		self.assertEqual([len(structure) for structure in grouper.getStructures()], [1])
+
+	def testRemoveAfterLinesWereCombined(self):
+		grouper = postProcessing.IncrementalGrouper(delta=1)
+		lines = grouper.add([LineSegment(0, 0, 3, 0), LineSegment(4, 0, 8, 0), LineSegment(20, 20, 20, 25)])
+		postProcessing.combineLinesWithEqualSlope(grouper.getStructures(), angle_epsilon=10)
+
+		grouper.remove(lines)
+
+		self.assertEqual(len(grouper), 0)
+
+	def testFailedRemoveChangesNothing(self):
+		grouper = postProcessing.IncrementalGrouper(delta=1)
+		line = LineSegment(0, 0, 3, 0)
+		grouper.add([line])
+
+		self.assertRaises(ValueError, grouper.remove, [line, LineSegment(9, 9, 9, 9)])
+
+		self.assertTrue(line in grouper)
+		self.assertEqual([len(structure) for structure in grouper.getStructures()], [1])
+
+	def testRemoveSplitsLargeStructureLocally(self):
+		grouper = postProcessing.IncrementalGrouper(delta=1)
+		chain = grouper.add([LineSegment(2 * i, 0, 2 * i + 1, 0) for i in range(20000)])
+
+		searchedLines = []
+		findAdjacentLines = grouper._findAdjacentLines
+		def countingFindAdjacentLines(lineId):
+			searchedLines.append(lineId)
+			return findAdjacentLines(lineId)
+
+		grouper._findAdjacentLines = countingFindAdjacentLines
+		grouper.remove([chain[-3]])
+
+		self.assertEqual(sorted(len(structure) for structure in grouper.getStructures()), [2, 19997])
+		self.assertTrue(len(searchedLines) < 10)
+
+		grouper.remove([chain[10000]])
+
+		self.assertEqual(sorted(len(structure) for structure in grouper.getStructures()), [2, 9996, 10000])
+		self.assertTrue(chain[9999] in grouper.structureOf(chain[0]))
+		self.assertFalse(chain[10001] in grouper.structureOf(chain[9999]))
+
+class JunctionGraphTest(unittest.TestCase):
+
+	def testStaircaseIsAPath(self):
+		graph = postProcessing.buildJunctionGraph(numpy.array([[0, 0, 1, 0], [2, 1, 3, 1], [4, 2, 5, 2], [6, 3, 7, 3]]))
+
+		self.assertEqual(len(graph.nodeCoordinates), 5)
+		self.assertFalse((graph.segmentNodes[:, 0] == graph.segmentNodes[:, 1]).any())
+		self.assertEqual(sorted(graph.degrees.tolist()), [1, 1, 2, 2, 2])
+
+	def testCircleHasNoLoops(self):
+		image = numpy.zeros((50, 50), dtype=bool)
+		angles = numpy.linspace(0, 2 * numpy.pi, 2000)
+		image[numpy.rint(25 + 20 * numpy.sin(angles)).astype(int), numpy.rint(25 + 20 * numpy.cos(angles)).astype(int)] = True
+		lines = numpy.array(lineFinding.findLines(image))
+
+		graph = postProcessing.buildJunctionGraph(lines, delta=1)
+
+		isPoint = (lines[:, 0] == lines[:, 2]) & (lines[:, 1] == lines[:, 3])
+		isLoop = graph.segmentNodes[:, 0] == graph.segmentNodes[:, 1]
+		self.assertEqual(isLoop.tolist(), isPoint.tolist())
+		self.assertEqual(graph.degrees.sum(), 2 * len(lines))
+
+if __name__ == "__main__":
+	unittest.main()
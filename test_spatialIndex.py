@@ -0,0 +1,92 @@
+"""
+Tests of the spatial index over lines
+
+# Filename: test_spatialIndex.py
+# Python version: 2.7
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import numpy
+import spatialIndex
+from lineFinding import LineSegment
+
+def createSegments(numSegments, seed=0):
+    """
+    Returns random segments [x1,y1,x2,y2] with some points (segments of length 0)
+    """
+    random = numpy.random.RandomState(seed)
+    starts = random.randint(0, 200, size=(numSegments, 2))
+    ends = starts + random.randint(-15, 16, size=(numSegments, 2))
+    ends[::7] = starts[::7]
+
+    return numpy.hstack((starts, ends))
+
+class SegmentIndexTest(unittest.TestCase):
+
+    def assertQueriesMatchBruteForce(self, index, segments):
+        segments = segments.astype(numpy.float64)
+        random = numpy.random.RandomState(1)
+
+        for _ in range(20):
+            (x_min, y_min) = random.uniform(-10, 200, size=2)
+            (width, height) = random.uniform(0, 40, size=2)
+            expected = numpy.flatnonzero(spatialIndex.segmentsIntersectBox(segments, x_min, y_min, x_min + width, y_min + height))
+            self.assertEqual(index.queryBox(x_min, y_min, x_min + width, y_min + height).tolist(), expected.tolist())
+
+            (x, y) = random.uniform(-10, 210, size=2)
+            distance = random.uniform(0, 20)
+            distances = spatialIndex.pointSegmentDistances(segments, x, y)
+            self.assertEqual(index.queryRadius(x, y, distance).tolist(), numpy.flatnonzero(distances <= distance).tolist())
+
+            k = random.randint(1, 10)
+            (indices, nearestDistances) = index.nearest(x, y, k=k)
+            self.assertEqual(len(indices), min(k, len(segments)))
+            numpy.testing.assert_allclose(nearestDistances, numpy.sort(distances)[:k])
+            numpy.testing.assert_allclose(distances[indices], nearestDistances)
+
+    def testQueriesMatchBruteForce(self):
+        segments = createSegments(500)
+
+        for nodeSize in (2, 3, 16, 1000):
+            index = spatialIndex.SegmentIndex(segments, nodeSize=nodeSize)
+            self.assertEqual(len(index), len(segments))
+            self.assertQueriesMatchBruteForce(index, segments)
+
+    def testAcceptsLineSegments(self):
+        segments = createSegments(50)
+        index = spatialIndex.SegmentIndex([LineSegment(*segment) for segment in segments], nodeSize=4)
+
+        self.assertQueriesMatchBruteForce(index, segments)
+
+    def testEmptyIndex(self):
+        index = spatialIndex.SegmentIndex([])
+
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.queryBox(0, 0, 10, 10).tolist(), [])
+        self.assertEqual(index.queryRadius(0, 0, 10).tolist(), [])
+        self.assertEqual(index.nearest(0, 0, k=3)[0].tolist(), [])
+
+    def testPickle(self):
+        segments = createSegments(300)
+        index = pickle.loads(pickle.dumps(spatialIndex.SegmentIndex(segments, nodeSize=8)))
+
+        self.assertQueriesMatchBruteForce(index, segments)
+
+    def testSaveAndLoad(self):
+        segments = createSegments(300)
+        directory = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(directory, "index.npz")
+            spatialIndex.SegmentIndex(segments, nodeSize=8).save(fileName)
+            index = spatialIndex.SegmentIndex.load(fileName)
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEqual(index.nodeSize, 8)
+        self.assertQueriesMatchBruteForce(index, segments)
+
+if __name__ == "__main__":
+    unittest.main()